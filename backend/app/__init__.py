@@ -1,14 +1,42 @@
+import os
+import time
+import logging
 from flask import Flask
 from flask_cors import CORS
 from .routes import configure_routes
 from .services.logging_config import setup_logging
+from .services.fetchers import YFinanceFetcher
+from .services.snapshots import schedule_snapshot_build
+from .services.warmup import schedule_warm_up, LAZY_MODULES
 
-def create_app():
+def create_app(config=None):
+    started = time.perf_counter()
     app = Flask(__name__)
+    app.config['DATA_DIRECTORY'] = '../data'
+    app.config['ETF_FETCHER'] = YFinanceFetcher()
+    app.config['FETCH_WORKERS'] = 8
+    app.config['SNAPSHOT_DIRECTORY'] = '../snapshots'
+    app.config['BUILD_SNAPSHOTS_ON_STARTUP'] = True
+    app.config['API_CACHE_MAX_AGE'] = 0  # Seconds browsers may reuse a response before revalidating its ETag
+    app.config['PROFILING_SECRET'] = os.environ.get('ETF_PROFILING_SECRET')  # Enables X-Profile-Token profiling of /api/* requests
+    app.config['LOG_FILE'] = 'app.log'
+    app.config['LOG_LEVEL'] = 'DEBUG'
+    app.config['LOG_LEVELS'] = {}  # Per-logger overrides, e.g. {'werkzeug': 'WARNING'}
+    app.config['LOG_FORMAT'] = 'text'  # or 'json', one object per line
+    app.config['LOG_SYMBOL_SAMPLE_EVERY'] = 100  # Keep 1 in N per-symbol processing messages
+    app.config['WARM_UP_ON_STARTUP'] = False  # Import LAZY_MODULES and load every symbol in the background
+    app.config['WARM_UP_MODULES'] = LAZY_MODULES
+    if config:
+        app.config.update(config)
     setup_logging(app)
     # Apply CORS to all routes
     CORS(app, resources={r"/api/*": {"origins": "*"}})  # Adjust origins as needed
     configure_routes(app)
+    if app.config['BUILD_SNAPSHOTS_ON_STARTUP']:
+        schedule_snapshot_build(app)
+    if app.config['WARM_UP_ON_STARTUP']:
+        schedule_warm_up(app)
+    logging.info(f"App created in {time.perf_counter() - started:.3f}s")
     return app
 
 
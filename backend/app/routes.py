@@ -1,11 +1,32 @@
-from flask import request
+from flask import request, current_app, url_for, send_file, stream_with_context, g
 import logging
 from flask import jsonify
 from flask_cors import CORS, cross_origin
-from .services.data_processing import process_etf_data_dt, process_etf_data_chart, add_etf, list_routes, fetch_etf_data, update_etf_info
+from .services.data_processing import process_etf_data_dt, process_etf_data_chart, add_etf, list_routes, fetch_etf_data, update_etf_info, RESAMPLE_METHODS, iter_etf_data_dt, page_etf_data_dt
+from .services.ingestion import normalize_history, save_history, refresh_symbol, ingest_symbols, INGEST_MODES
+from .services.cache import result_cache, symbol_cache, data_signature, data_version
+from .services.jobs import job_queue
+from .services.snapshots import ensure_snapshot, build_snapshots, schedule_snapshot_build, available_encodings, ENCODING_SUFFIXES, SNAPSHOT_BUILDERS
+from .services.etf_store import parse_day, is_valid_symbol
+from .services.arrow_export import chart_arrow_stream, ARROW_STREAM_MIMETYPE, load_pyarrow
+from .services.metrics import metrics, timed
+from .services.profiling import profile_store
 import pandas as pd
 import numpy as np
 import os
+import json
+import hashlib
+import hmac
+import time
+import cProfile
+import threading
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 10000
+PROFILE_HEADER = 'X-Profile-Token'
+# Only one capture at a time: from Python 3.12 cProfile hooks the process-wide
+# sys.monitoring, so a second profiler cannot start and each capture also sees other threads
+_profiler_lock = threading.Lock()
 
 def configure_routes(app):
     app.route('/api/etfs', methods=['GET'])(get_etf_data)
@@ -31,12 +52,49 @@ def configure_routes(app):
                 response = jsonify({"error": "ETF symbol is required"})
                 response.status_code = 400
                 return response
+            if not is_valid_symbol(symbol):
+                logging.error(f"Invalid ETF symbol: {symbol}")
+                response = jsonify({"error": f"Invalid ETF symbol: {symbol}"})
+                response.status_code = 400
+                return response
+
+            data_directory = current_app.config['DATA_DIRECTORY']
+            mode = etf_data.get('mode', 'full')
+            if mode not in INGEST_MODES:
+                logging.error(f"Unknown ingestion mode: {mode}")
+                response = jsonify({"error": f"mode must be one of {', '.join(INGEST_MODES)}: {mode}"})
+                response.status_code = 400
+                return response
+
+            # "async" hands the download to the job queue and answers with a job id
+            if etf_data.get('async'):
+                return submit_ingestion_job([symbol], mode)
+
+            # "incremental" only fetches the days after the last stored one
+            if mode == 'incremental':
+                try:
+                    result = refresh_symbol(data_directory, symbol, current_app.config['ETF_FETCHER'].fetch)
+                except Exception as e:
+                    logging.error(f"Failed to refresh data for {symbol}: {str(e)}")
+                    response = jsonify({"error": f"Failed to refresh data for {symbol}: {str(e)}"})
+                    response.status_code = 500
+                    return response
+                if result['mode'] == 'full' and result['rows'] == 0:
+                    logging.error(f"No data found for ETF symbol: {symbol}")
+                    response = jsonify({"error": f"No data found for ETF symbol: {symbol}"})
+                    response.status_code = 404
+                    return response
+                if result['rows']:
+                    schedule_snapshot_build(current_app._get_current_object())
+                response = jsonify(dict(result, message=f"ETF {symbol} has been refreshed with {result['rows']} rows."))
+                logging.info(f"ETF {symbol} has been refreshed ({result['mode']}, {result['rows']} rows).")
+                return response
 
             ##logging.info(f"Fetching data for symbol: {symbol}")
 
             # Fetch historical data
             try:
-                history = fetch_etf_data(symbol)
+                history = current_app.config['ETF_FETCHER'].fetch(symbol)
                 logging.info(f"Fetched {len(history)} rows of historical data for {symbol}")
             except Exception as e:
                 logging.error(f"Failed to fetch data for {symbol}: {str(e)}")
@@ -50,28 +108,14 @@ def configure_routes(app):
                 response.status_code = 404
                 return response
 
-            # Reset index to convert it into a column named "Date"
-            history.reset_index(inplace=True)
-
-            # Keep only "Date" and "Close" columns
-            history['Date'] = pd.to_datetime(history['Date']).dt.strftime('%Y-%m-%d')
-            history = history[['Date', 'Close']]
-
-            # Round the "Close" column to 3 decimal places
-            history['Close'] = history['Close'].round(3)
-
-            # Save the fetched and rounded data as a CSV file in the 'data' directory
-            data_directory = '../data'
-            if not os.path.exists(data_directory):
-                os.makedirs(data_directory)
-
-            csv_filename = os.path.join(data_directory, f"{symbol}.csv")
+            # Keep only "Date" and "Close" (rounded to 3 decimals) and save them in the 'data' directory
+            history = normalize_history(history)
             try:
-                history.to_csv(csv_filename, index=False)  # Don't include the index in the CSV
-                logging.info(f"ETF data saved successfully for symbol: {symbol} at {csv_filename}")
+                save_history(data_directory, symbol, history)
+                logging.info(f"ETF data saved successfully for symbol: {symbol} in {data_directory}")
             except Exception as e:
-                logging.error(f"Failed to save CSV for {symbol}: {str(e)}")
-                response = jsonify({"error": f"Failed to save CSV for {symbol}: {str(e)}"})
+                logging.error(f"Failed to save data for {symbol}: {str(e)}")
+                response = jsonify({"error": f"Failed to save data for {symbol}: {str(e)}"})
                 response.status_code = 500
                 return response
 
@@ -87,6 +131,8 @@ def configure_routes(app):
                 return response
             '''
             
+            schedule_snapshot_build(current_app._get_current_object())
+
             # Return success response
             response = jsonify({"message": f"ETF {symbol} has been added successfully."})
             logging.info(f"ETF {symbol} has been added successfully.")
@@ -100,21 +146,355 @@ def configure_routes(app):
             return response
     
     
+    app.route('/api/etfs/add_bulk', methods=['POST'])(cross_origin(origins="*")(add_etfs_bulk))
+    app.route('/api/jobs/<job_id>', methods=['GET'])(get_job_status)
+    app.route('/api/cache/stats', methods=['GET'])(get_cache_stats)
     app.route('/routes', methods=['GET'])(list_routes)
+    app.route('/metrics', methods=['GET'])(get_metrics)
+    app.route('/debug/profiles', methods=['GET'])(list_profiles)
+    app.route('/debug/profiles/<profile_id>', methods=['GET'])(get_profile)
+    app.before_request(start_request_timer)
+    app.after_request(record_request_metrics)
+    app.before_request(start_profiler)
+    app.after_request(finish_profiler)
+    app.teardown_request(stop_profiler)
     # Additional routes can be configured here
 
-def get_etf_data():
-    data = process_etf_data_dt()
-    response = jsonify(data)
+def request_route():
+    # The URL rule rather than the path, so /api/jobs/<job_id> is one series
+    return request.url_rule.rule if request.url_rule else 'unmatched'
+
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+def record_request_metrics(response):
+    route = request_route()
+    metrics.observe('etf_request_seconds', time.perf_counter() - g.request_started, route=route)
+    metrics.increment('etf_requests_total', route=route, method=request.method, status=response.status_code)
+    # Streamed bodies of unknown length count their own bytes as they are sent (see ndjson_response)
+    if response.content_length is not None:
+        metrics.observe('etf_response_bytes', response.content_length, route=route)
+    return response
+
+def get_metrics():
+    return current_app.response_class(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+def profiling_authorized():
+    # Profiling is off unless PROFILING_SECRET is configured and the request carries it
+    secret = current_app.config['PROFILING_SECRET']
+    token = request.headers.get(PROFILE_HEADER)
+    return bool(secret) and token is not None and hmac.compare_digest(token.encode('utf-8'), secret.encode('utf-8'))
+
+def start_profiler():
+    if not (request.path.startswith('/api/') and profiling_authorized()):
+        return
+    if not _profiler_lock.acquire(blocking=False):
+        logging.info(f"Not profiling {request.full_path}: another capture is running")
+        g.profile_skipped = True
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError as e:  # Another profiling tool outside this app is active
+        _profiler_lock.release()
+        logging.info(f"Not profiling {request.full_path}: {str(e)}")
+        g.profile_skipped = True
+        return
+    g.profiler = profiler
+
+def finish_profiler(response):
+    # Covers the view up to the response object; a streamed body is generated after this
+    if g.pop('profile_skipped', False):
+        response.headers['X-Profile-Skipped'] = 'busy'
+    profiler = g.pop('profiler', None)
+    if profiler is None:
+        return response
+    profiler.disable()
+    _profiler_lock.release()
+    profile_id = profile_store.add(profiler, request.method, request.full_path, response.status_code)
+    logging.info(f"Stored profile {profile_id} for {request.method} {request.full_path}")
+    response.headers['X-Profile-Id'] = profile_id
+    response.headers['X-Profile-Url'] = url_for('get_profile', profile_id=profile_id)
+    return response
+
+def stop_profiler(error=None):
+    # A view that raised never reaches finish_profiler
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.disable()
+        _profiler_lock.release()
+
+def list_profiles():
+    if not profiling_authorized():
+        response = jsonify({"error": "Not found"})
+        response.status_code = 404
+        return response
+    return jsonify({'profiles': profile_store.list()})
+
+def get_profile(profile_id):
+    # The cumulative-time report as text, or with format=pstats the raw stats
+    # for pstats.Stats / snakeviz
+    profile = profile_store.get(profile_id) if profiling_authorized() else None
+    if profile is None:
+        response = jsonify({"error": f"Unknown profile: {profile_id}"})
+        response.status_code = 404
+        return response
+    if request.args.get('format') == 'pstats':
+        response = current_app.response_class(profile['pstats'], mimetype='application/octet-stream')
+        response.headers['Content-Disposition'] = f"attachment; filename={profile_id}.pstats"
+        return response
+    header = f"{profile['method']} {profile['path']} -> {profile['status']} at {profile['created_at']}\n"
+    return current_app.response_class(header + profile['report'], mimetype='text/plain')
+
+def with_cache_headers(response, etag):
+    response.set_etag(etag)
+    response.cache_control.no_cache = None  # Set by send_file; freshness is governed by max-age instead
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config['API_CACHE_MAX_AGE']
+    response.cache_control.must_revalidate = True
+    response.vary.add('Accept-Encoding')
     response.headers.add("Access-Control-Allow-Origin", "*")
     return response
 
+def snapshot_etags(name, version):
+    # Each encoding is a different representation, so it gets its own strong tag
+    return {encoding: f"{name}-{version}" + (f"-{encoding}" if encoding else '') for encoding in (None, *ENCODING_SUFFIXES)}
+
+def send_snapshot(name, directory, version):
+    # The body is a pre-built file for the data version; only built here if the
+    # background build after startup or ingestion has not produced it yet
+    path = ensure_snapshot(name, directory, current_app.config['SNAPSHOT_DIRECTORY'], version)
+    encoding = request.accept_encodings.best_match(available_encodings(path))
+    if encoding:
+        response = send_file(path + ENCODING_SUFFIXES[encoding], mimetype='application/json', conditional=False)
+        response.headers['Content-Encoding'] = encoding
+    else:
+        response = send_file(path, mimetype='application/json', conditional=False)
+    return response, encoding
+
+def snapshot_response(name):
+    # The ETag is derived from file stats alone, so a client that already has
+    # the current data version gets a 304 without any data being read
+    directory = current_app.config['DATA_DIRECTORY']
+    version = data_version(data_signature(directory))
+    etags = snapshot_etags(name, version)
+    cached = [encoding for encoding, etag in etags.items() if request.if_none_match.contains_weak(etag)]
+    if cached:
+        response = current_app.response_class(status=304)
+        encoding = cached[0]
+    else:
+        try:
+            response, encoding = send_snapshot(name, directory, version)
+        except FileNotFoundError:
+            # A build for newer data replaced this version's files between the lookup
+            # and the open; serve whatever version is current now
+            logging.info(f"Snapshot {name}-{version} was replaced while being served, serving the current version")
+            version = data_version(data_signature(directory))
+            etags = snapshot_etags(name, version)
+            response, encoding = send_snapshot(name, directory, version)
+    return with_cache_headers(response, etags[encoding])
+
+def parse_query_filters(downsample=False, ordering=False, paging=False):
+    # ?symbols=QQQ,BND&start=2020-01-01&end=2020-12 (dates as YYYY-MM-DD or YYYY-MM),
+    # plus max_points=N and resample=last|first|mean|ohlc on the chart endpoint,
+    # order=asc|desc on streamed and paged output and limit=N&after=<date> on paged output
+    symbols = request.args.get('symbols')
+    start = request.args.get('start')
+    end = request.args.get('end')
+    # Sorted, so the same set of symbols in any order is one body and one ETag
+    symbols = sorted(set(s for s in symbols.split(',') if s)) if symbols else None
+    for symbol in symbols or []:
+        if not is_valid_symbol(symbol):
+            raise ValueError(f"Invalid symbol: {symbol}")
+    filters = {
+        'symbols': symbols,
+        'start': parse_day(start) if start else None,
+        'end': parse_day(end, end=True) if end else None,
+    }
+    if downsample:
+        max_points = request.args.get('max_points')
+        if max_points is not None and (not max_points.isdigit() or int(max_points) < 3):
+            raise ValueError(f"max_points must be an integer of at least 3: {max_points}")
+        filters['max_points'] = int(max_points) if max_points is not None else None
+        resample = request.args.get('resample')
+        if resample is not None and resample not in RESAMPLE_METHODS:
+            raise ValueError(f"resample must be one of {', '.join(RESAMPLE_METHODS)}: {resample}")
+        filters['resample'] = resample if resample != 'last' else None
+    if ordering:
+        order = request.args.get('order', 'asc')
+        if order not in ('asc', 'desc'):
+            raise ValueError(f"order must be asc or desc: {order}")
+        filters['descending'] = order == 'desc'
+    if paging:
+        limit = request.args.get('limit', str(DEFAULT_PAGE_SIZE))
+        if not limit.isdigit() or not 1 <= int(limit) <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be an integer from 1 to {MAX_PAGE_SIZE}: {limit}")
+        filters['limit'] = int(limit)
+        after = request.args.get('after')
+        filters['after'] = parse_day(after) if after else None
+    return filters
+
+def filtered_response(name, filters, render=None):
+    # Only the requested symbols' files are stat'ed and read. render(directory, filters)
+    # builds non-JSON responses; by default the body is the JSON of SNAPSHOT_BUILDERS[name].
+    directory = current_app.config['DATA_DIRECTORY']
+    version = data_version(data_signature(directory, filters['symbols']))
+    query = repr(sorted(filters.items()))
+    etag = f"{name}-{version}-{hashlib.sha1(query.encode('utf-8')).hexdigest()[:8]}"
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+    elif render:
+        response = render(directory, filters)
+    else:
+        data = SNAPSHOT_BUILDERS[name](directory, **filters)
+        with timed('serialize'):
+            response = jsonify(data)
+    return with_cache_headers(response, etag)
+
+def arrow_response(directory, filters):
+    # Arrow carries the daily rows, so there is nothing to resample
+    filters = {key: value for key, value in filters.items() if key != 'resample'}
+    return current_app.response_class(chart_arrow_stream(directory, **filters), mimetype=ARROW_STREAM_MIMETYPE)
+
+def ndjson_response(directory, filters):
+    # Lines are produced as the client reads them; only per-symbol rows are held in memory
+    def generate():
+        sent = 0
+        for date, etfs in iter_etf_data_dt(directory, **filters):
+            line = json.dumps({date: etfs}, sort_keys=True, separators=(',', ':')) + '\n'
+            sent += len(line)  # json.dumps escapes to ASCII, so characters are bytes
+            yield line
+        metrics.observe('etf_response_bytes', sent, route=request_route())
+    return current_app.response_class(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+def page_response(directory, filters):
+    data = page_etf_data_dt(directory, **filters)
+    with timed('serialize'):
+        return jsonify(data)
+
+def data_response(name, downsample=False, ordering=False, paging=False):
+    try:
+        filters = parse_query_filters(downsample, ordering, paging)
+    except ValueError as e:
+        response = jsonify({"error": str(e)})
+        response.status_code = 400
+        return response
+    if name == 'chart_data_arrow':
+        if load_pyarrow() is None:
+            response = jsonify({"error": "Arrow output is not available on this server"})
+            response.status_code = 406
+            return response
+        return filtered_response(name, filters, render=arrow_response)
+    if name == 'etfs_ndjson':
+        return filtered_response(name, filters, render=ndjson_response)
+    if name == 'etfs_page':
+        return filtered_response(name, filters, render=page_response)
+    if any(value is not None for value in filters.values()):
+        return filtered_response(name, filters)
+    return snapshot_response(name)
+
+def get_etf_data():
+    # format=ndjson streams one {date: {symbol: record}} line per date;
+    # with order=desc the newest dates come first
+    response_format = request.args.get('format', 'json')
+    if response_format not in ('json', 'ndjson'):
+        response = jsonify({"error": f"Unsupported format: {response_format}"})
+        response.status_code = 400
+        return response
+    if response_format == 'ndjson':
+        if 'limit' in request.args or 'after' in request.args:
+            # The stream always runs to the end of the range; paging is for format=json
+            response = jsonify({"error": "limit and after are not supported with format=ndjson"})
+            response.status_code = 400
+            return response
+        return data_response('etfs_ndjson', ordering=True)
+    # limit=N and/or after=<date> return one page as {data, dates, next_cursor};
+    # pass next_cursor back as after= for the following page
+    if 'limit' in request.args or 'after' in request.args:
+        return data_response('etfs_page', ordering=True, paging=True)
+    return data_response('etfs')
+
 def get_etf_chart_data_double():
-    data = process_etf_data_chart()
-    response = jsonify(data)
-    response.headers.add("Access-Control-Allow-Origin", "*")    
+    # format=columnar returns {symbols, dates, series: {symbol: {field: [...]}}};
+    # format=arrow (or Accept: application/vnd.apache.arrow.stream) an Arrow IPC stream
+    response_format = request.args.get('format')
+    if response_format is None:
+        best = request.accept_mimetypes.best_match(['application/json', ARROW_STREAM_MIMETYPE])
+        response_format = 'arrow' if best == ARROW_STREAM_MIMETYPE else 'json'
+    if response_format not in ('json', 'columnar', 'arrow'):
+        response = jsonify({"error": f"Unsupported format: {response_format}"})
+        response.status_code = 400
+        return response
+    response = data_response('chart_data' if response_format == 'json' else f"chart_data_{response_format}", downsample=True)
+    response.vary.add('Accept')
     return response
 
+def add_etfs_bulk():
+    etf_data = request.get_json(silent=True)
+    symbols = etf_data.get('symbols') if isinstance(etf_data, dict) else None
+    if not isinstance(symbols, list) or not symbols or not all(isinstance(s, str) and s for s in symbols):
+        logging.error("ETF symbols list is missing or invalid")
+        response = jsonify({"error": "A non-empty list of ETF symbols is required"})
+        response.status_code = 400
+        return response
+    invalid = [symbol for symbol in symbols if not is_valid_symbol(symbol)]
+    if invalid:
+        logging.error(f"Invalid ETF symbols: {invalid}")
+        response = jsonify({"error": f"Invalid ETF symbols: {', '.join(invalid)}"})
+        response.status_code = 400
+        return response
+
+    mode = etf_data.get('mode', 'full')
+    if mode not in INGEST_MODES:
+        logging.error(f"Unknown ingestion mode: {mode}")
+        response = jsonify({"error": f"mode must be one of {', '.join(INGEST_MODES)}: {mode}"})
+        response.status_code = 400
+        return response
+
+    if etf_data.get('async'):
+        return submit_ingestion_job(symbols, mode)
+
+    results = ingest_symbols(current_app.config['DATA_DIRECTORY'], symbols,
+                             current_app.config['ETF_FETCHER'].fetch,
+                             mode=mode,
+                             max_workers=current_app.config['FETCH_WORKERS'])
+    added = sum(1 for result in results if result['status'] == 'ok')
+    if added:
+        schedule_snapshot_build(current_app._get_current_object())
+    logging.info(f"Bulk add finished: {added} of {len(results)} ETFs added")
+    return jsonify({"message": f"{added} of {len(results)} ETFs have been added successfully.", "results": results})
+
+def submit_ingestion_job(symbols, mode):
+    # The worker thread has no request context, so take what it needs from the app now
+    app = current_app._get_current_object()
+    directory = app.config['DATA_DIRECTORY']
+    fetch = app.config['ETF_FETCHER'].fetch
+    max_workers = app.config['FETCH_WORKERS']
+
+    def ingest(report):
+        results = ingest_symbols(directory, symbols, fetch, mode=mode, max_workers=max_workers, progress=report)
+        if any(result['status'] == 'ok' for result in results):
+            with app.app_context():
+                build_snapshots(directory, app.config['SNAPSHOT_DIRECTORY'])
+        return results
+
+    job_id = job_queue.submit('ingest', ingest, total=len(dict.fromkeys(symbols)))
+    logging.info(f"Queued ingestion job {job_id} for {len(symbols)} ETFs")
+    response = jsonify({"job_id": job_id, "status_url": url_for('get_job_status', job_id=job_id)})
+    response.status_code = 202
+    return response
+
+def get_job_status(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        response = jsonify({"error": f"Unknown job: {job_id}"})
+        response.status_code = 404
+        return response
+    return jsonify(job)
+
+def get_cache_stats():
+    return jsonify({'results': result_cache.stats(), 'symbols': symbol_cache.stats()})
+
 '''
 def add_etf():
     try:
@@ -0,0 +1,72 @@
+import json
+import functools
+import numpy as np
+from .cache import data_signature
+from .data_processing import get_symbol_artifact, symbol_smoothed, SMOOTHING_WINDOWS
+from .metrics import timed
+from .downsampling import lttb_indices
+from .etf_store import day_range
+
+ARROW_STREAM_MIMETYPE = 'application/vnd.apache.arrow.stream'
+
+# Daily per-symbol series, one record batch per symbol
+ARROW_FIELDS = ('close', 'normalized_close', 'detrended', 'normalized_detrended') + \
+    tuple(f"smoothed_{window}" for window in SMOOTHING_WINDOWS)
+
+
+@functools.lru_cache(maxsize=None)
+def load_pyarrow():
+    # pyarrow is optional and imported on the first Arrow request rather than at startup;
+    # None when it is not installed, in which case the Arrow output is unavailable
+    try:
+        import pyarrow
+    except ImportError:
+        return None
+    return pyarrow
+
+
+def arrow_schema(symbols, min_max_values):
+    pa = load_pyarrow()
+    return pa.schema(
+        [pa.field('symbol', pa.dictionary(pa.int32(), pa.string())), pa.field('date', pa.date32())] +
+        [pa.field(field, pa.float64()) for field in ARROW_FIELDS],
+        metadata={'symbols': json.dumps(symbols), 'min_max': json.dumps(min_max_values)})
+
+
+def symbol_batch(schema, index, dictionary, artifact, rows):
+    # With rows a slice the float and date columns wrap the artifact's NumPy
+    # buffers without copying; an index array (downsampling) gathers a copy
+    pa = load_pyarrow()
+    days = np.ascontiguousarray(artifact['days'][rows], dtype=np.int32)
+    series = [artifact['close'], artifact['normalized_close'], artifact['detrended'],
+              artifact['normalized_detrended']] + list(symbol_smoothed(artifact))
+    symbol = pa.DictionaryArray.from_arrays(pa.array(np.full(len(days), index, dtype=np.int32)), dictionary)
+    columns = [symbol, pa.array(days, type=pa.date32())]
+    columns += [pa.array(np.ascontiguousarray(values[rows], dtype=np.float64)) for values in series]
+    return pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+@timed('assemble_chart_arrow')
+def chart_arrow_stream(directory='../data', symbols=None, start=None, end=None, max_points=None):
+    pa = load_pyarrow()
+    if pa is None:
+        raise RuntimeError("Arrow output requires the pyarrow package")
+    signature = data_signature(directory, symbols)
+    artifacts = {etf_name: get_symbol_artifact(directory, etf_name, file_signature)
+                 for etf_name, file_signature in signature.items()}
+    names = list(artifacts)
+    min_max_values = {etf_name: {'min': float(a['min']), 'max': float(a['max'])} for etf_name, a in artifacts.items()}
+    schema = arrow_schema(names, min_max_values)
+    # One dictionary shared by every batch, so the stream never replaces it
+    dictionary = pa.array(names, type=pa.string())
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for index, etf_name in enumerate(names):
+            artifact = artifacts[etf_name]
+            lo, hi = day_range(artifact['days'], start, end)
+            rows = slice(lo, hi)
+            if max_points and max_points < hi - lo:
+                rows = lo + lttb_indices(artifact['normalized_detrended'][rows], max_points, x=artifact['days'][rows])
+            writer.write_batch(symbol_batch(schema, index, dictionary, artifact, rows))
+    return sink.getvalue().to_pybytes()
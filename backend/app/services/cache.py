@@ -0,0 +1,139 @@
+import os
+import hashlib
+import threading
+import logging
+
+DATA_EXTENSIONS = ('.csv', '.col')
+
+
+def data_signature(directory='../data', symbols=None):
+    # {symbol: ((filename, size, mtime_ns), ...)} for every data file of the symbol.
+    # With symbols given only their files are stat'ed, not the whole directory.
+    files = {}
+    if symbols is None:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name.endswith(DATA_EXTENSIONS):
+                    stat = entry.stat()
+                    symbol = entry.name.rsplit('.', 1)[0]
+                    files.setdefault(symbol, []).append((entry.name, stat.st_size, stat.st_mtime_ns))
+    else:
+        for symbol in symbols:
+            for extension in DATA_EXTENSIONS:
+                filename = f"{symbol}{extension}"
+                try:
+                    stat = os.stat(os.path.join(directory, filename))
+                except FileNotFoundError:
+                    continue
+                files.setdefault(symbol, []).append((filename, stat.st_size, stat.st_mtime_ns))
+    return {symbol: tuple(sorted(entries)) for symbol, entries in files.items()}
+
+
+def symbol_version(file_signature):
+    # Short digest of one symbol's file stats; changes whenever one of its files does
+    return hashlib.sha1(repr(file_signature).encode('utf-8')).hexdigest()[:12]
+
+
+def symbol_versions(signature):
+    return {symbol: symbol_version(file_signature) for symbol, file_signature in signature.items()}
+
+
+def data_version(signature):
+    # Digest of every symbol's version, so it changes when any symbol is added, removed or rewritten
+    digest = hashlib.sha1(repr(sorted(symbol_versions(signature).items())).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+class ResultCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._results = {}     # (name, directory) -> (signature, data)
+        self._signatures = {}  # directory -> last signature seen
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _note_changes(self, directory, signature):
+        previous = self._signatures.get(directory)
+        self._signatures[directory] = signature
+        if previous is None or previous == signature:
+            return
+        changed = {symbol for symbol in previous.keys() | signature.keys()
+                   if previous.get(symbol) != signature.get(symbol)}
+        stale = [key for key, entry in self._results.items()
+                 if key[1] == directory and entry[0] != signature]
+        for key in stale:
+            del self._results[key]
+        self.invalidations += len(stale)
+        logging.info(f"Data changed in {directory} for {sorted(changed)}, dropped {len(stale)} cached results")
+
+    def get_or_compute(self, name, directory, compute):
+        signature = data_signature(directory)
+        key = (name, directory)
+        with self._lock:
+            self._note_changes(directory, signature)
+            entry = self._results.get(key)
+            if entry is not None and entry[0] == signature:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        data = compute()
+        with self._lock:
+            self._results[key] = (signature, data)
+        return data
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+            self._signatures.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'entries': len(self._results),
+            }
+
+
+result_cache = ResultCache()
+
+
+class SymbolCache:
+    # Per-symbol computed values, each tied to the stats of that symbol's files,
+    # so a change to one symbol only recomputes that symbol
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}  # (directory, kind, symbol) -> (file_signature, value)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, directory, kind, symbol, file_signature, compute):
+        key = (directory, kind, symbol)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == file_signature:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        value = compute()
+        with self._lock:
+            self._entries[key] = (file_signature, value)
+        return value
+
+    def prune(self, directory, symbols):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == directory and key[2] not in symbols]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
+
+
+symbol_cache = SymbolCache()
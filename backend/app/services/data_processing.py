@@ -1,32 +1,44 @@
 import pandas as pd
 import numpy as np
 import os
-from scipy.signal import savgol_filter
-import yfinance as yf 
+import bisect
+import heapq
+import logging
+from itertools import groupby, repeat
+from operator import itemgetter
 from flask import url_for
+from .etf_store import load_symbol, day_strings, month_strings, day_range
+from .cache import data_signature, symbol_cache, result_cache
+from .detrending import polynomial_trend
+from .smoothing import moving_linear_smooth
+from .metrics import timed
+from .downsampling import lttb_indices
+
+logger = logging.getLogger(__name__)
+# Messages logged once per symbol per request; setup_logging samples this logger
+symbol_logger = logging.getLogger(f"{__name__}.symbols")
+
+SMOOTHING_WINDOWS = (201, 401, 601)
 
 
 def detrend_data(prices):
-    x = np.arange(len(prices))
     y = np.array(prices)
-    model = np.polyfit(x, y, 3)
-    trend = np.poly1d(model)
-    detrended = y - trend(x)
+    detrended = y - polynomial_trend(y)
     return detrended
 
-def detrend_data_norm(prices, etf_name):
-    x = np.arange(len(prices))
-    y = np.array(prices)
-    model = np.polyfit(x, y, 3)
-    trend = np.poly1d(model)
-    detrended = y - trend(x)
+def normalize_detrended(detrended, etf_name):
     min_val_D = np.min(detrended)
     max_val_D = np.max(detrended)
-    print(f"MIN and MAX for ETF symbol {etf_name}: {min_val_D} {max_val_D}")
+    symbol_logger.debug(f"MIN and MAX for ETF symbol {etf_name}: {min_val_D} {max_val_D}",
+                        extra={'symbol': etf_name, 'min': float(min_val_D), 'max': float(max_val_D)})
     normalized_detrended = 100 * (detrended - min_val_D) / (max_val_D - min_val_D) if max_val_D != min_val_D else np.zeros_like(detrended)
-    return normalized_detrended.tolist()
+    return normalized_detrended
+
+def detrend_data_norm(prices, etf_name):
+    return normalize_detrended(detrend_data(prices), etf_name).tolist()
 
 def smooth_data(prices, window_length=11, polyorder=3):
+    from scipy.signal import savgol_filter  # scipy is slow to import and the endpoints use moving_linear_smooth
     if len(prices) < window_length:
         window_length = len(prices) if len(prices) % 2 != 0 else len(prices) - 1
     elif window_length % 2 == 0:
@@ -47,80 +59,300 @@ def calculate_color(value, max_val_C, min_val_C):
         return 0
     return round(((value - min_val_C) / (max_val_C - min_val_C) * 20) - 10, 2)
 
-def process_etf_data_dt(directory='../data'):
+def round_array(values, ndigits=2):
+    # Same result as calling round(v, ndigits) on every element. np.round only
+    # disagrees with it when v * 10**ndigits sits within float noise of a .5 tie,
+    # so just those elements are re-rounded in Python.
+    values = np.asarray(values, dtype=float)
+    scale = 10.0 ** ndigits
+    scaled = values * scale
+    rounded = np.round(scaled) / scale
+    with np.errstate(invalid='ignore'):
+        near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for i in np.flatnonzero(near_tie):
+        rounded.flat[i] = round(float(values.flat[i]), ndigits)
+    return rounded
+
+def clean_symbol_columns(days, closes):
+    valid = ~np.isnan(closes)  # Drop rows where 'Close' is missing
+    days, closes = np.asarray(days[valid]), np.asarray(closes[valid])
+    if np.any(np.diff(days) < 0):
+        # Range lookups and month grouping rely on ascending dates
+        order = np.argsort(days, kind='stable')
+        days, closes = days[order], closes[order]
+    return days, closes
+
+def compute_symbol_artifact(days, closes, etf_name):
+    # Everything both endpoints derive from one symbol's price history, apart from
+    # the smoothing levels (see symbol_smoothed).
+    # The cubic trend is fitted once and shared by the raw and normalized detrended series.
+    days, closes = clean_symbol_columns(days, closes)
+    with timed('normalize'):
+        normalized_close, min_val_C, max_val_C = norm_close(closes)
+    with timed('detrend'):
+        detrended = closes - polynomial_trend(closes)
+        normalized_detrended = normalize_detrended(detrended, etf_name)
+    return {
+        'days': days,
+        'close': closes,
+        'min': min_val_C,
+        'max': max_val_C,
+        'normalized_close': np.asarray(normalized_close),
+        'detrended': detrended,
+        'normalized_detrended': normalized_detrended,
+    }
+
+def symbol_smoothed(artifact):
+    # The smoothing levels (one row per window) only feed the chart outputs, so they are
+    # computed on first use and kept on the artifact; /api/etfs never pays for them
+    smoothed = artifact.get('smoothed')
+    if smoothed is None:
+        with timed('smooth'):
+            smoothed = artifact['smoothed'] = moving_linear_smooth(artifact['normalized_detrended'], SMOOTHING_WINDOWS)
+    return smoothed
+
+def get_symbol_artifact(directory, etf_name, file_signature):
+    def compute():
+        with timed('load'):
+            days, closes = load_symbol(directory, etf_name)
+        return compute_symbol_artifact(days, closes, etf_name)
+    return symbol_cache.get(directory, 'artifact', etf_name, file_signature, compute)
+
+@timed('dt_rows')
+def dt_symbol_rows(artifact):
+    close = round_array(artifact['close'])
+    max_close, min_close = artifact['max'], artifact['min']
+    detrended_close = round_array(artifact['normalized_detrended'])
+    if max_close != min_close:
+        color = round_array((close - min_close) / (max_close - min_close) * 20 - 10).tolist()
+    else:
+        color = [0] * len(close)
+    prev_close = np.concatenate(([0.0], close[:-1]))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        glp = round_array((close - prev_close) / prev_close * 100).tolist()
+
+    # calculate_color() yields None for a zero close and the row loop
+    # used to write an int 0 for it, as it did for GLP on the first row
+    for i in np.flatnonzero(close == 0):
+        color[i] = 0
+    for i in np.flatnonzero(prev_close == 0):
+        glp[i] = 0
+
+    dates = day_strings(artifact['days']).tolist()
+    records = [{'Close': c, 'Color': col, 'DC': dc, 'GLP': g}
+               for c, col, dc, g in zip(close.tolist(), color, detrended_close.tolist(), glp)]
+    return dates, records
+
+def dt_symbol_slices(directory, symbols=None, start=None, end=None):
+    # (etf_name, dates, records) per symbol, limited to [start, end] by binary search
+    signature = data_signature(directory, symbols)
+    if symbols is None:
+        symbol_cache.prune(directory, signature)
+    slices = []
+    for etf_name, file_signature in signature.items():
+        symbol_logger.debug(f"Processing ETF data for symbol: {etf_name}", extra={'symbol': etf_name})
+        artifact = get_symbol_artifact(directory, etf_name, file_signature)
+        dates, records = symbol_cache.get(directory, 'dt', etf_name, file_signature, lambda: dt_symbol_rows(artifact))
+        lo, hi = day_range(artifact['days'], start, end)
+        slices.append((etf_name, dates[lo:hi], records[lo:hi]))
+    return slices
+
+@timed('assemble_dt')
+def process_etf_data_dt(directory='../data', symbols=None, start=None, end=None):
+    # symbols limits which files are read; start/end (day numbers, inclusive) select
+    # rows by binary search. Values are still derived from each symbol's full history.
     date_indexed_etfs = {}
-    for filename in os.listdir(directory):
-        if filename.endswith('.csv'):
-            full_path = os.path.join(directory, filename)
-            df = pd.read_csv(full_path)
-            print(f"Processing ETF data from file: {filename}")
-            df = df[['Date', 'Close']]  # Keep only Date and Close columns
-            df['Date'] = pd.to_datetime(df['Date'], errors='coerce', utc=True).dt.strftime('%Y-%m-%d')
-            etf_name = filename[:-4]
-            max_close = df['Close'].max()
-            min_close = df['Close'].min()
-            df = df.dropna(subset=['Close'])  # Drop rows where 'Close' is missing
-            df['Detrended Closing'] = detrend_data_norm(df['Close'], etf_name)
-            prev_close = 0.0
-            close = 0.0
-            for index, row in df.iterrows():
-                date = row['Date']
-                prev_close = close
-                close = round(row['Close'], 2)
-                color = calculate_color(close, max_close, min_close)
-                detrended_close = round(row['Detrended Closing'], 2)
-                if date not in date_indexed_etfs:
-                    date_indexed_etfs[date] = {}
-                date_indexed_etfs[date][etf_name] = {
-                    'Close': round(close, 2),
-                    'Color': round(color, 2) if color is not None else 0,
-                    'DC': round(detrended_close, 2),
-                    'GLP': round(((close - prev_close) / prev_close * 100), 2) if prev_close != 0 else 0
-                }
+    for etf_name, dates, records in dt_symbol_slices(directory, symbols, start, end):
+        for date, record in zip(dates, records):
+            if date not in date_indexed_etfs:
+                date_indexed_etfs[date] = {}
+            date_indexed_etfs[date][etf_name] = record
     return date_indexed_etfs
 
-def process_etf_data_chart(directory='../data'):
+def date_index(directory='../data', symbols=None):
+    # Sorted day numbers on which any of the symbols has a row
+    def compute():
+        signature = data_signature(directory, symbols)
+        days = [get_symbol_artifact(directory, etf_name, file_signature)['days']
+                for etf_name, file_signature in signature.items()]
+        return np.unique(np.concatenate(days)) if days else np.array([], dtype=np.int32)
+    if symbols is None:
+        return result_cache.get_or_compute('date_index', directory, compute)
+    return compute()
+
+@timed('assemble_etfs_page')
+def page_etf_data_dt(directory='../data', symbols=None, start=None, end=None, after=None, limit=100, descending=False):
+    # One page of process_etf_data_dt: `limit` dates strictly after the `after` cursor
+    # (before it when descending), found by binary search on the sorted date index
+    index = date_index(directory, symbols)
+    lo, hi = day_range(index, start, end)
+    index = index[lo:hi]
+    if descending:
+        stop = int(np.searchsorted(index, after, side='left')) if after is not None else len(index)
+        page = index[max(0, stop - limit):stop][::-1]
+        has_more = stop - limit > 0
+    else:
+        begin = int(np.searchsorted(index, after, side='right')) if after is not None else 0
+        page = index[begin:begin + limit]
+        has_more = begin + limit < len(index)
+    dates = day_strings(page).tolist()
+    data = process_etf_data_dt(directory, symbols, int(page.min()), int(page.max())) if len(page) else {}
+    return {'data': data, 'dates': dates, 'next_cursor': dates[-1] if has_more else None}
+
+def iter_etf_data_dt(directory='../data', symbols=None, start=None, end=None, descending=False):
+    # Yields (date, {symbol: record}) one date at a time, merging the per-symbol
+    # sorted rows with a k-way merge instead of building the whole dict
+    slices = dt_symbol_slices(directory, symbols, start, end)
+    if descending:
+        streams = [zip(reversed(dates), repeat(etf_name), reversed(records)) for etf_name, dates, records in slices]
+    else:
+        streams = [zip(dates, repeat(etf_name), records) for etf_name, dates, records in slices]
+    merged = heapq.merge(*streams, key=itemgetter(0), reverse=descending)
+    for date, rows in groupby(merged, key=itemgetter(0)):
+        yield date, {etf_name: record for _, etf_name, record in rows}
+
+def nan_to_none(values):
+    values = np.asarray(values, dtype=float)
+    out = values.astype(object)
+    out[np.isnan(values)] = None
+    return out.tolist()
+
+CHART_FIELDS = ('normalized_close', 'detrended', 'close', 'normalized_detrended', 'smoothed', 'smoothed1', 'smoothed2')
+# max_points downsampling picks rows by LTTB on the series the chart draws
+DOWNSAMPLE_FIELD = 'normalized_detrended'
+
+RESAMPLE_METHODS = ('last', 'first', 'mean', 'ohlc')
+
+def month_groups(days):
+    # Month keys and the index where each month's (contiguous) rows start
+    months = np.asarray(days).astype('datetime64[D]').astype('datetime64[M]')
+    starts = np.flatnonzero(np.concatenate(([True], months[1:] != months[:-1])))
+    return np.datetime_as_string(months[starts]), starts
+
+def resample_monthly(values, starts, how='last'):
+    # One grouped reduction per month: its last/first row, the mean of its
+    # non-NaN rows, or [open, high, low, close] as an (n, 4) array
+    values = np.asarray(values, dtype=float)
+    if len(values) == 0:
+        return np.empty((0, 4) if how == 'ohlc' else 0)
+    ends = np.append(starts[1:], len(values)) - 1
+    if how == 'last':
+        return values[ends]
+    if how == 'first':
+        return values[starts]
+    if how == 'mean':
+        valid = ~np.isnan(values)
+        sums = np.add.reduceat(np.where(valid, values, 0.0), starts)
+        counts = np.add.reduceat(valid.astype(np.int64), starts)
+        with np.errstate(invalid='ignore'):
+            return sums / counts
+    if how == 'ohlc':
+        return np.column_stack((values[starts], np.fmax.reduceat(values, starts),
+                                np.fmin.reduceat(values, starts), values[ends]))
+    raise ValueError(f"Unknown resample method: {how}")
+
+@timed('chart_columns')
+def chart_symbol_columns(artifact, resample='last'):
+    # Month keys and one rounded array per CHART_FIELDS entry. The default 'last'
+    # keeps what the old per-row loop produced, where each row overwrote the month.
+    months, starts = month_groups(artifact['days'])
+    series = [artifact['normalized_close'], artifact['detrended'], artifact['close'],
+              artifact['normalized_detrended']] + list(symbol_smoothed(artifact))
+    return months, {field: round_array(resample_monthly(values, starts, resample))
+                    for field, values in zip(CHART_FIELDS, series)}
+
+@timed('chart_rows')
+def chart_symbol_rows(artifact, resample='last'):
+    months, columns = chart_symbol_columns(artifact, resample)
+    values = [columns[field].tolist() for field in CHART_FIELDS[:3]]
+    values += [nan_to_none(columns[field]) for field in CHART_FIELDS[3:]]
+    return months.tolist(), [list(row) for row in zip(*values)]
+
+@timed('downsample')
+def downsample_rows(columns, lo, hi, max_points):
+    # For OHLC the month's close drives the selection
+    driver = columns[DOWNSAMPLE_FIELD]
+    driver = driver if driver.ndim == 1 else driver[:, -1]
+    return lo + lttb_indices(driver[lo:hi], max_points)
+
+@timed('assemble_chart')
+def process_etf_data_chart(directory='../data', symbols=None, start=None, end=None, max_points=None, resample=None):
+    # Same filters as process_etf_data_dt; start/end select whole months.
+    # max_points keeps at most that many months per symbol, chosen by LTTB.
+    # resample is one of RESAMPLE_METHODS and picks how a month's rows are reduced.
     date_indexed_etfs = {}
     min_max_values = {}
-    for filename in os.listdir(directory):
-        if filename.endswith('.csv'):
-            full_path = os.path.join(directory, filename)
-            df = pd.read_csv(full_path)
-            print(f"Processing chart data from file: {filename}")
-            df = df[['Date', 'Close']]  # Keep only Date and Close columns
-            df['Date'] = pd.to_datetime(df['Date'], errors='coerce', utc=True).dt.strftime('%Y-%m')
-            etf_name = filename[:-4]
-
-            df = df.dropna(subset=['Close'])  # Drop rows where 'Close' is missing
-
-            # Now perform detrending, normalization, and smoothing on valid data only
-            df['Detrended'] = detrend_data(df['Close'])
-            df['Normalized Close'], min_val_C, max_val_C = norm_close(df['Close'])
-            df['Normalized Detrended'] = detrend_data_norm(df['Close'], etf_name)
-            df['Smoothed'] = smooth_data(df['Normalized Detrended'],201,1)
-            df['Smoothed1'] = smooth_data(df['Normalized Detrended'],401,1)
-            df['Smoothed2'] = smooth_data(df['Normalized Detrended'],601,1)            
-            min_max_values[etf_name] = {'min': min_val_C, 'max': max_val_C}
-            
-            for index, row in df.iterrows():
-                date = row['Date']
-                normalized_close = round(row['Normalized Close'], 2)
-                detrended = round(row['Detrended'], 2)
-                normalized_detrended = round(row['Normalized Detrended'], 2) if not pd.isna(row['Normalized Detrended']) else None
-                smoothed = round(row['Smoothed'], 2) if not pd.isna(row['Smoothed']) else None
-                smoothed1 = round(row['Smoothed1'], 2) if not pd.isna(row['Smoothed1']) else None
-                smoothed2 = round(row['Smoothed2'], 2) if not pd.isna(row['Smoothed2']) else None                                
-                close = round(row['Close'], 2)
-
-                # Log the values for debugging between specific dates
-                if False and '2006-11' <= date <= '2007-07' and filename.startswith('BND.csv'):
-                    print(f"Date: {date}, ETF: {etf_name}, Close: {close}, Normalized Close: {normalized_close}, Detrended: {detrended}, Normalized Detrended: {normalized_detrended}, Smoothed: {smoothed}")
-                
-                if date not in date_indexed_etfs:
-                    date_indexed_etfs[date] = {}
-                date_indexed_etfs[date][etf_name] = [normalized_close, detrended, close, normalized_detrended, smoothed, smoothed1, smoothed2]
+    signature = data_signature(directory, symbols)
+    if symbols is None:
+        symbol_cache.prune(directory, signature)
+    resample = resample or 'last'
+    start_month = month_strings([start])[0] if start is not None else None
+    end_month = month_strings([end])[0] if end is not None else None
+    for etf_name, file_signature in signature.items():
+        symbol_logger.debug(f"Processing chart data for symbol: {etf_name}", extra={'symbol': etf_name})
+        artifact = get_symbol_artifact(directory, etf_name, file_signature)
+        min_max_values[etf_name] = {'min': artifact['min'], 'max': artifact['max']}
+        months, rows = symbol_cache.get(directory, f"chart_{resample}", etf_name, file_signature,
+                                        lambda: chart_symbol_rows(artifact, resample))
+        lo = bisect.bisect_left(months, start_month) if start_month else 0
+        hi = bisect.bisect_right(months, end_month) if end_month else len(months)
+        if max_points:
+            _, columns = symbol_cache.get(directory, f"chart_columns_{resample}", etf_name, file_signature,
+                                          lambda: chart_symbol_columns(artifact, resample))
+            selected = downsample_rows(columns, lo, hi, max_points).tolist()
+        else:
+            selected = range(lo, hi)
+        for i in selected:
+            date = months[i]
+            if date not in date_indexed_etfs:
+                date_indexed_etfs[date] = {}
+            date_indexed_etfs[date][etf_name] = rows[i]
     return {'data': date_indexed_etfs, 'min_max': min_max_values}
 
+@timed('assemble_chart_columnar')
+def process_etf_data_chart_columnar(directory='../data', symbols=None, start=None, end=None, max_points=None, resample=None):
+    # Same values as process_etf_data_chart as {symbols, dates, series: {symbol: {field: [...]}}},
+    # every array aligned to the sorted union of months, with null for gaps and NaN
+    signature = data_signature(directory, symbols)
+    if symbols is None:
+        symbol_cache.prune(directory, signature)
+    resample = resample or 'last'
+    start_month = month_strings([start])[0] if start is not None else None
+    end_month = month_strings([end])[0] if end is not None else None
+    selected = {}
+    min_max_values = {}
+    for etf_name, file_signature in signature.items():
+        symbol_logger.debug(f"Processing columnar chart data for symbol: {etf_name}", extra={'symbol': etf_name})
+        artifact = get_symbol_artifact(directory, etf_name, file_signature)
+        min_max_values[etf_name] = {'min': artifact['min'], 'max': artifact['max']}
+        months, columns = symbol_cache.get(directory, f"chart_columns_{resample}", etf_name, file_signature,
+                                           lambda: chart_symbol_columns(artifact, resample))
+        # Month keys ascend, so the requested range is one contiguous slice
+        lo = int(np.searchsorted(months, start_month, side='left')) if start_month else 0
+        hi = int(np.searchsorted(months, end_month, side='right')) if end_month else len(months)
+        rows = downsample_rows(columns, lo, hi, max_points)
+        selected[etf_name] = (months[rows], {field: values[rows] for field, values in columns.items()})
+
+    months = [m for m, _ in selected.values()]
+    dates = np.unique(np.concatenate(months)) if months else np.array([], dtype='<U7')
+
+    series = {}
+    for etf_name, (symbol_months, columns) in selected.items():
+        positions = np.searchsorted(dates, symbol_months)
+        gaps = np.ones(len(dates), dtype=bool)
+        gaps[positions] = False
+        series[etf_name] = {}
+        for field in CHART_FIELDS:
+            aligned = np.full((len(dates),) + columns[field].shape[1:], np.nan)
+            aligned[positions] = columns[field]
+            values = nan_to_none(aligned)
+            if aligned.ndim > 1:
+                # A month without a row is one null, not an OHLC row of nulls
+                for i in np.flatnonzero(gaps):
+                    values[i] = None
+            series[etf_name][field] = values
+    return {'symbols': list(series), 'dates': dates.tolist(), 'series': series, 'min_max': min_max_values}
+
 def add_etf():
     try:
         logging.info("add_etf endpoint called")
@@ -218,21 +450,23 @@ def list_routes():
     
     return "<br>".join(output)
 
-def fetch_etf_data(symbol):
+def fetch_etf_data(symbol, start=None):
+    import yfinance as yf  # Only ingestion needs yfinance, so workers that just serve data never import it
     try:
         etf = yf.Ticker(symbol)
-        history = etf.history(period="max")
+        history = etf.history(start=start) if start else etf.history(period="max")
         return history
     except Exception as e:
         raise Exception(f"Failed to fetch data for {symbol}: {str(e)}")
 
 def fetch_etf_sector(symbol):
+    import yfinance as yf
     try:
         etf = yf.Ticker(symbol)
         sector_info = etf.info.get('sector', 'N/A')
         return sector_info
     except Exception as e:
-        print(f"Failed to fetch sector information for {symbol}: {str(e)}")
+        logger.error(f"Failed to fetch sector information for {symbol}: {str(e)}", extra={'symbol': symbol})
         return 'N/A'
 
 def update_etf_info(symbol, sector, data_directory='../frontend/src/data'):
@@ -253,4 +487,4 @@ def update_etf_info(symbol, sector, data_directory='../frontend/src/data'):
     # Write updated info back to the file
     with open(etfs_info_path, 'w') as f:
         json.dump(etfs_info, f, indent=4)
-        print(f"ETF info updated successfully for symbol: {symbol}")
+        logger.info(f"ETF info updated successfully for symbol: {symbol}", extra={'symbol': symbol})
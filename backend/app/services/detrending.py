@@ -0,0 +1,24 @@
+import functools
+import numpy as np
+
+TREND_DEGREE = 3
+
+
+@functools.lru_cache(maxsize=32)
+def _trend_basis(length, degree):
+    # Vandermonde matrix of the row index scaled to [0, 1] (well conditioned) and its QR factors
+    x = np.arange(length) / (length - 1)
+    vandermonde = np.vander(x, degree + 1)
+    q, r = np.linalg.qr(vandermonde)
+    return vandermonde, q, r
+
+
+def polynomial_trend(prices, degree=TREND_DEGREE):
+    # Least-squares polynomial of the row index fitted to one series, evaluated at every row
+    prices = np.asarray(prices, dtype=float)
+    if len(prices) <= degree:
+        # Too few rows for a unique fit; np.polyfit returns its minimum-norm solution
+        x = np.arange(len(prices))
+        return np.poly1d(np.polyfit(x, prices, degree))(x)
+    vandermonde, q, r = _trend_basis(len(prices), degree)
+    return vandermonde @ np.linalg.solve(r, q.T @ prices)
@@ -0,0 +1,34 @@
+import numpy as np
+
+
+def lttb_indices(y, threshold, x=None):
+    # Largest-Triangle-Three-Buckets: indices of `threshold` points that keep the
+    # visual shape of y. First and last points are always kept; every bucket in
+    # between contributes the point forming the largest triangle with the previously
+    # kept point and the average of the next bucket.
+    y = np.nan_to_num(np.asarray(y, dtype=np.float64))
+    n = len(y)
+    if threshold is None or threshold >= n:
+        return np.arange(n)
+    if threshold < 3:
+        raise ValueError("LTTB needs at least 3 points")
+    x = np.arange(n, dtype=np.float64) if x is None else np.asarray(x, dtype=np.float64)
+
+    # threshold - 2 buckets over points 1..n-2; each one holds at least one point since threshold < n
+    edges = np.floor(np.linspace(1, n - 1, threshold - 1)).astype(np.intp)
+    counts = np.diff(edges)
+    avg_x = np.add.reduceat(x[:n - 1], edges[:-1]) / counts
+    avg_y = np.add.reduceat(y[:n - 1], edges[:-1]) / counts
+    # The bucket after the last one is the final point itself
+    avg_x = np.append(avg_x[1:], x[n - 1])
+    avg_y = np.append(avg_y[1:], y[n - 1])
+
+    selected = np.empty(threshold, dtype=np.intp)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for bucket in range(threshold - 2):
+        lo, hi = edges[bucket], edges[bucket + 1]
+        area = np.abs((x[a] - avg_x[bucket]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y[bucket] - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[bucket + 1] = a
+    return selected
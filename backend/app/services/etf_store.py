@@ -0,0 +1,147 @@
+import os
+import re
+import logging
+import shutil
+import numpy as np
+import pandas as pd
+
+# One binary file per symbol:
+#   8-byte magic | uint64 row count | int32 day numbers (days since 1970-01-01)
+#   | zero padding to an 8-byte boundary | float64 closes
+# Both columns are read back with numpy.memmap, so loading a symbol needs no parsing.
+COLUMNAR_EXTENSION = '.col'
+MAGIC = b'ETFCOL1\0'
+HEADER_SIZE = 16
+
+logger = logging.getLogger(__name__)
+# Symbols become file names, so only plain tickers (e.g. QQQ, BRK.B, ^GSPC) are accepted from clients
+SYMBOL_PATTERN = re.compile(r'[A-Za-z0-9.^-]+')
+
+
+def _closes_offset(count):
+    days_end = HEADER_SIZE + 4 * count
+    return days_end + (-days_end % 8)
+
+
+def is_valid_symbol(symbol):
+    return isinstance(symbol, str) and SYMBOL_PATTERN.fullmatch(symbol) is not None
+
+
+def columnar_path(directory, symbol):
+    return os.path.join(directory, f"{symbol}{COLUMNAR_EXTENSION}")
+
+
+def csv_path(directory, symbol):
+    return os.path.join(directory, f"{symbol}.csv")
+
+
+def to_day_numbers(dates):
+    # Same parsing the processing code always applied to the CSV Date column
+    timestamps = pd.to_datetime(pd.Series(dates), errors='coerce', utc=True).dt.tz_localize(None)
+    return timestamps.to_numpy().astype('datetime64[D]').astype(np.int64)
+
+
+def day_strings(days):
+    return np.datetime_as_string(np.asarray(days).astype('datetime64[D]'))
+
+
+def month_strings(days):
+    return np.datetime_as_string(np.asarray(days).astype('datetime64[D]').astype('datetime64[M]'))
+
+
+def parse_day(value, end=False):
+    # 'YYYY-MM-DD' or 'YYYY-MM' to a day number; a month as an end bound means its last day
+    if not re.fullmatch(r'\d{4}-\d{2}(-\d{2})?', value):
+        raise ValueError(f"Invalid date: {value}")
+    if len(value) == 7:
+        month = np.datetime64(value, 'M')
+        day = (month + 1).astype('datetime64[D]') - 1 if end else month.astype('datetime64[D]')
+    else:
+        day = np.datetime64(value, 'D')
+    return int(day.astype(np.int64))
+
+
+def day_range(days, start=None, end=None):
+    # Index bounds of [start, end] in ascending day numbers, by binary search
+    lo = int(np.searchsorted(days, start, side='left')) if start is not None else 0
+    hi = int(np.searchsorted(days, end, side='right')) if end is not None else len(days)
+    return lo, max(lo, hi)
+
+
+def write_symbol(directory, symbol, dates, closes):
+    days = to_day_numbers(dates)
+    closes = np.asarray(closes, dtype=np.float64)
+    keep = ~np.isnat(days.astype('datetime64[D]'))  # Rows without a parseable date cannot be stored
+    days, closes = days[keep].astype(np.int32), closes[keep]
+    write_columns(directory, symbol, days, closes)
+
+
+def write_csv(directory, symbol, frame, existing=False):
+    # Writes frame as the symbol's Date,Close CSV, or with existing=True appends its rows
+    # to the current CSV. Either way readers only ever see the old or the new file.
+    path = csv_path(directory, symbol)
+    tmp_path = f"{path}.tmp"
+    if existing:
+        shutil.copyfile(path, tmp_path)
+        with open(tmp_path, 'a') as f:
+            f.write(frame.to_csv(header=False, index=False))  # pandas always ends the CSV with a newline
+    else:
+        frame.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def write_columns(directory, symbol, days, closes):
+    count = len(days)
+    path = columnar_path(directory, symbol)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(np.uint64(count).tobytes())
+        f.write(np.asarray(days, dtype='<i4').tobytes())
+        f.write(b'\0' * (_closes_offset(count) - HEADER_SIZE - 4 * count))
+        f.write(np.asarray(closes, dtype='<f8').tobytes())
+    os.replace(tmp_path, path)  # Readers never see a half-written file
+
+
+def read_columns(directory, symbol):
+    path = columnar_path(directory, symbol)
+    with open(path, 'rb') as f:
+        header = f.read(HEADER_SIZE)
+    if len(header) != HEADER_SIZE or header[:8] != MAGIC:
+        raise ValueError(f"Not a columnar ETF file: {path}")
+    count = int(np.frombuffer(header[8:], dtype='<u8')[0])
+    if count == 0:
+        return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float64)
+    days = np.memmap(path, dtype='<i4', mode='r', offset=HEADER_SIZE, shape=(count,))
+    closes = np.memmap(path, dtype='<f8', mode='r', offset=_closes_offset(count), shape=(count,))
+    return days, closes
+
+
+def read_csv_columns(directory, symbol):
+    df = pd.read_csv(csv_path(directory, symbol))
+    days = to_day_numbers(df['Date'])
+    closes = df['Close'].to_numpy(dtype=np.float64)
+    keep = ~np.isnat(days.astype('datetime64[D]'))
+    return days[keep].astype(np.int32), closes[keep]
+
+
+def load_symbol(directory, symbol):
+    # The columnar file wins unless the CSV was rewritten after it
+    col_file = columnar_path(directory, symbol)
+    csv_file = csv_path(directory, symbol)
+    if os.path.exists(col_file):
+        if not os.path.exists(csv_file) or os.path.getmtime(col_file) >= os.path.getmtime(csv_file):
+            return read_columns(directory, symbol)
+    return read_csv_columns(directory, symbol)
+
+
+def migrate_directory(directory='../data'):
+    migrated = []
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith('.csv'):
+            symbol = filename[:-4]
+            days, closes = read_csv_columns(directory, symbol)
+            write_columns(directory, symbol, days, closes)
+            logger.info(f"Migrated {filename} to {symbol}{COLUMNAR_EXTENSION} ({len(days)} rows)", extra={'symbol': symbol})
+            migrated.append(symbol)
+    return migrated
@@ -0,0 +1,34 @@
+import os
+import time
+import pandas as pd
+from .data_processing import fetch_etf_data
+
+# A fetcher is any object with fetch(symbol, start=None) returning a
+# yfinance-style history: a DataFrame indexed by "Date" with a "Close" column,
+# empty when the symbol is unknown. The app uses app.config['ETF_FETCHER'].
+
+
+class YFinanceFetcher:
+    def fetch(self, symbol, start=None):
+        return fetch_etf_data(symbol, start=start)
+
+
+class LocalFetcher:
+    # Serves histories from Date,Close CSVs in a local directory, for running
+    # ingestion without network access. delay simulates upstream latency.
+    def __init__(self, directory, delay=0.0):
+        self.directory = directory
+        self.delay = delay
+
+    def fetch(self, symbol, start=None):
+        if self.delay:
+            time.sleep(self.delay)
+        path = os.path.join(self.directory, f"{symbol}.csv")
+        if not os.path.exists(path):
+            return pd.DataFrame(columns=['Close'], index=pd.DatetimeIndex([], name='Date'))
+        history = pd.read_csv(path, usecols=['Date', 'Close'])
+        history['Date'] = pd.to_datetime(history['Date'])
+        history = history.set_index('Date')
+        if start:
+            history = history[history.index >= pd.Timestamp(start)]
+        return history
@@ -0,0 +1,134 @@
+import os
+import logging
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+from .data_processing import fetch_etf_data
+from .etf_store import csv_path, load_symbol, write_symbol, write_columns, write_csv, to_day_numbers, day_strings
+
+# Stored and fetched closes are both rounded to 3 decimals, so anything beyond
+# rounding noise on the overlapping day means upstream re-adjusted the history
+OVERLAP_TOLERANCE = 0.0015
+INGEST_MODES = ('full', 'incremental')
+
+_symbol_locks = {}
+_symbol_locks_guard = threading.Lock()
+
+
+def symbol_lock(directory, symbol):
+    # One lock per stored symbol, held from reading its files to writing them back,
+    # so two ingestions of the same symbol never interleave. Reentrant because a
+    # refresh can fall back to a full download.
+    key = (os.path.abspath(directory), symbol)
+    with _symbol_locks_guard:
+        lock = _symbol_locks.get(key)
+        if lock is None:
+            lock = _symbol_locks[key] = threading.RLock()
+        return lock
+
+
+def normalize_history(history):
+    # Reset index to convert it into a column named "Date"
+    history = history.reset_index()
+    # Keep only "Date" and "Close" columns
+    history['Date'] = pd.to_datetime(history['Date']).dt.strftime('%Y-%m-%d')
+    history = history[['Date', 'Close']].copy()
+    # Round the "Close" column to 3 decimal places
+    history['Close'] = history['Close'].round(3)
+    return history
+
+
+def save_history(directory, symbol, history):
+    os.makedirs(directory, exist_ok=True)
+    with symbol_lock(directory, symbol):
+        write_csv(directory, symbol, history)
+        # Columnar copy is written after the CSV so it is never older than it
+        write_symbol(directory, symbol, history['Date'], history['Close'])
+
+
+def download_symbol(directory, symbol, fetch=fetch_etf_data):
+    with symbol_lock(directory, symbol):
+        history = fetch(symbol)
+        if history.empty:
+            return {'symbol': symbol, 'mode': 'full', 'rows': 0}
+        history = normalize_history(history)
+        save_history(directory, symbol, history)
+    logging.info(f"Downloaded full history for {symbol}: {len(history)} rows")
+    return {'symbol': symbol, 'mode': 'full', 'rows': len(history)}
+
+
+def append_history(directory, symbol, days, closes, tail):
+    if os.path.exists(csv_path(directory, symbol)):
+        write_csv(directory, symbol, tail, existing=True)
+    new_days = np.concatenate((np.asarray(days), to_day_numbers(tail['Date']))).astype(np.int32)
+    new_closes = np.concatenate((np.asarray(closes), tail['Close'].to_numpy(dtype=np.float64)))
+    write_columns(directory, symbol, new_days, new_closes)
+
+
+def refresh_symbol(directory, symbol, fetch=fetch_etf_data):
+    # Fetches only the days after the last stored one. Falls back to a full
+    # download when nothing is stored yet or the overlapping day no longer matches.
+    with symbol_lock(directory, symbol):
+        return _refresh_symbol(directory, symbol, fetch)
+
+
+def _refresh_symbol(directory, symbol, fetch):
+    try:
+        days, closes = load_symbol(directory, symbol)
+    except FileNotFoundError:
+        return download_symbol(directory, symbol, fetch)
+    if len(days) == 0:
+        return download_symbol(directory, symbol, fetch)
+
+    last_day = int(days[-1])
+    tail = fetch(symbol, start=str(day_strings(days[-1:])[0]))
+    if tail.empty:
+        return {'symbol': symbol, 'mode': 'incremental', 'rows': 0}
+    tail = normalize_history(tail)
+    tail_days = to_day_numbers(tail['Date'])
+
+    overlap = np.flatnonzero(tail_days == last_day)
+    if len(overlap) == 0 or not abs(tail['Close'].iloc[overlap[0]] - closes[-1]) <= OVERLAP_TOLERANCE:
+        logging.info(f"Stored history for {symbol} does not match upstream on its last day, downloading it again")
+        return download_symbol(directory, symbol, fetch)
+
+    tail = tail[tail_days > last_day]
+    if not tail.empty:
+        append_history(directory, symbol, days, closes, tail)
+    logging.info(f"Appended {len(tail)} rows to {symbol}")
+    return {'symbol': symbol, 'mode': 'incremental', 'rows': len(tail)}
+
+
+def ingest_symbol(directory, symbol, fetch=fetch_etf_data, mode='full'):
+    # Never raises, so one bad symbol cannot fail a whole batch
+    started = time.perf_counter()
+    try:
+        if mode not in INGEST_MODES:
+            raise ValueError(f"mode must be one of {', '.join(INGEST_MODES)}: {mode}")
+        if mode == 'incremental':
+            result = refresh_symbol(directory, symbol, fetch)
+        else:
+            result = download_symbol(directory, symbol, fetch)
+    except Exception as e:
+        logging.error(f"Failed to ingest {symbol}: {str(e)}")
+        result = {'symbol': symbol, 'mode': mode, 'rows': 0, 'status': 'error', 'error': str(e)}
+    else:
+        result['status'] = 'not_found' if result['mode'] == 'full' and result['rows'] == 0 else 'ok'
+    result['seconds'] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def ingest_symbols(directory, symbols, fetch=fetch_etf_data, mode='full', max_workers=8, progress=None):
+    # Fetches run concurrently on a bounded pool; results keep the input order.
+    # progress(done, total) is called as each symbol finishes.
+    symbols = list(dict.fromkeys(symbols))
+    if not symbols:
+        return []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(symbols))) as pool:
+        futures = [pool.submit(ingest_symbol, directory, symbol, fetch, mode) for symbol in symbols]
+        for done, _ in enumerate(as_completed(futures), 1):
+            if progress:
+                progress(done, len(symbols))
+        return [future.result() for future in futures]
@@ -0,0 +1,80 @@
+import time
+import uuid
+import logging
+import threading
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobQueue:
+    # In-process background jobs. func(report) runs on a worker thread and may
+    # call report(done, total) to publish progress; its return value becomes the result.
+    def __init__(self, max_workers=4, max_finished=1000):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='etf-job')
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._max_finished = max_finished
+
+    def submit(self, kind, func, total=None):
+        job_id = uuid.uuid4().hex
+        job = {
+            'id': job_id,
+            'kind': kind,
+            'status': 'queued',
+            'progress': {'done': 0, 'total': total},
+            'submitted_at': datetime.now(timezone.utc).isoformat(),
+            'queued_seconds': None,
+            'run_seconds': None,
+            'result': None,
+            'error': None,
+            '_submitted': time.perf_counter(),
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+            self._evict_finished()
+        self._executor.submit(self._run, job, func)
+        return job_id
+
+    def _run(self, job, func):
+        started = time.perf_counter()
+        with self._lock:
+            job['status'] = 'running'
+            job['queued_seconds'] = round(started - job['_submitted'], 3)
+
+        def report(done, total=None):
+            with self._lock:
+                job['progress'] = {'done': done, 'total': total if total is not None else job['progress']['total']}
+
+        try:
+            result = func(report)
+        except Exception as e:
+            logging.error(f"Job {job['id']} ({job['kind']}) failed: {str(e)}")
+            with self._lock:
+                job['status'] = 'failed'
+                job['error'] = str(e)
+        else:
+            with self._lock:
+                job['status'] = 'done'
+                job['result'] = result
+        with self._lock:
+            job['run_seconds'] = round(time.perf_counter() - started, 3)
+        logging.info(f"Job {job['id']} ({job['kind']}) {job['status']} in {job['run_seconds']}s")
+
+    def _evict_finished(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job['status'] in ('done', 'failed')]
+        for job_id in finished[:max(0, len(finished) - self._max_finished)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            snapshot = {key: value for key, value in job.items() if not key.startswith('_')}
+            snapshot['progress'] = dict(job['progress'])
+            if job['status'] in ('queued', 'running'):
+                snapshot['elapsed_seconds'] = round(time.perf_counter() - job['_submitted'], 3)
+            return snapshot
+
+
+job_queue = JobQueue()
@@ -1,4 +1,92 @@
+import atexit
+import copy
+import itertools
+import json
 import logging
+import logging.handlers
+import queue
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+# Attributes every LogRecord has; anything else on a record came from extra={...}
+STANDARD_ATTRIBUTES = set(logging.LogRecord('', 0, '', 0, '', None, None).__dict__) | {'message', 'asctime'}
+
+_listener = None
+
+
+class StructuredFormatter(logging.Formatter):
+    # Text lines in the original format with the record's extra fields appended as
+    # key=value, or with json_output one JSON object per line
+    def __init__(self, json_output=False):
+        super().__init__(TEXT_FORMAT)
+        self.json_output = json_output
+
+    def format(self, record):
+        fields = {key: value for key, value in record.__dict__.items() if key not in STANDARD_ATTRIBUTES}
+        if not self.json_output:
+            line = super().format(record)
+            return ' '.join([line] + [f"{key}={value}" for key, value in fields.items()])
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            **fields,
+        }
+        exception = record.exc_text or (self.formatException(record.exc_info) if record.exc_info else None)
+        if exception:
+            entry['exception'] = exception
+        if record.stack_info:
+            entry['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+class RecordQueueHandler(logging.handlers.QueueHandler):
+    # The stock prepare() folds the traceback into the message and drops exc_info,
+    # so the listener's formatter could never write it separately. Here the message
+    # is only merged with its args and the traceback is kept as exc_text, rendered
+    # on the logging thread while the exception is still current.
+    def prepare(self, record):
+        record = copy.copy(record)  # Other handlers of the record still see the original
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+
+class SamplingFilter(logging.Filter):
+    # Passes the first of every `every` records, for messages logged once per symbol per request
+    def __init__(self, every):
+        super().__init__()
+        self.every = max(1, every)
+        self._counter = itertools.count()
+
+    def filter(self, record):
+        return next(self._counter) % self.every == 0
+
 
 def setup_logging(app):
-    logging.basicConfig(filename='app.log', level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+    # Request threads only put records on a queue; a QueueListener thread formats
+    # them and writes LOG_FILE. Levels are LOG_LEVEL for the root logger plus
+    # LOG_LEVELS overrides per logger name, e.g. {'app.services.data_processing': 'INFO'}.
+    global _listener
+    root = logging.getLogger()
+    root.setLevel(app.config['LOG_LEVEL'])
+    for name, level in app.config['LOG_LEVELS'].items():
+        logging.getLogger(name).setLevel(level)
+    symbol_logger = logging.getLogger('app.services.data_processing.symbols')
+    for sampling_filter in [f for f in symbol_logger.filters if isinstance(f, SamplingFilter)]:
+        symbol_logger.removeFilter(sampling_filter)
+    symbol_logger.addFilter(SamplingFilter(app.config['LOG_SYMBOL_SAMPLE_EVERY']))
+    if _listener is not None:
+        return  # The pipeline is process-wide; later apps only adjust levels and sampling
+
+    file_handler = logging.FileHandler(app.config['LOG_FILE'])
+    file_handler.setFormatter(StructuredFormatter(json_output=app.config['LOG_FORMAT'] == 'json'))
+    records = queue.SimpleQueue()
+    root.addHandler(RecordQueueHandler(records))
+    _listener = logging.handlers.QueueListener(records, file_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)  # Flushes records still queued at shutdown
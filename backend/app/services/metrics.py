@@ -0,0 +1,86 @@
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+# name -> (Prometheus type, help text)
+METRIC_FAMILIES = {
+    'etf_stage_seconds': ('summary', 'Time spent in each data-processing stage'),
+    'etf_request_seconds': ('summary', 'Time to produce each route response, up to the first byte for streams'),
+    'etf_response_bytes': ('summary', 'Size of each route response body'),
+    'etf_requests_total': ('counter', 'Requests served by route, method and status'),
+}
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _label_text(labels):
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped))
+
+
+class Metrics:
+    # Counters and summaries kept in process. Summaries hold an exact count and sum;
+    # quantiles come from the most recent `window` samples, so recording stays O(1).
+    def __init__(self, window=2048):
+        self._lock = threading.Lock()
+        self._window = window
+        self._summaries = {}  # (name, labels) -> [count, total, recent samples]
+        self._counters = {}   # (name, labels) -> value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            entry = self._summaries.get(key)
+            if entry is None:
+                entry = self._summaries[key] = [0, 0.0, deque(maxlen=self._window)]
+            entry[0] += 1
+            entry[1] += value
+            entry[2].append(value)
+
+    def increment(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def clear(self):
+        with self._lock:
+            self._summaries.clear()
+            self._counters.clear()
+
+    def render(self):
+        # Prometheus text exposition format, version 0.0.4
+        with self._lock:
+            summaries = {key: (count, total, sorted(samples)) for key, (count, total, samples) in self._summaries.items()}
+            counters = dict(self._counters)
+        lines = []
+        for name, (kind, help_text) in METRIC_FAMILIES.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == 'counter':
+                for (family, labels), value in sorted(counters.items()):
+                    if family == name:
+                        lines.append(f"{name}{{{_label_text(labels)}}} {value}")
+                continue
+            for (family, labels), (count, total, samples) in sorted(summaries.items()):
+                if family != name:
+                    continue
+                for quantile in QUANTILES:
+                    value = samples[min(len(samples) - 1, int(quantile * len(samples)))]
+                    quantile_labels = _label_text(labels + (('quantile', quantile),))
+                    lines.append(f"{name}{{{quantile_labels}}} {value!r}")
+                lines.append(f"{name}_sum{{{_label_text(labels)}}} {total!r}")
+                lines.append(f"{name}_count{{{_label_text(labels)}}} {count}")
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+
+
+@contextmanager
+def timed(stage):
+    # Records the wall time of a block (or, used as a decorator, of a call) under etf_stage_seconds
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.observe('etf_stage_seconds', time.perf_counter() - start, stage=stage)
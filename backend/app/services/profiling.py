@@ -0,0 +1,53 @@
+import io
+import uuid
+import pstats
+import marshal
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+PROFILE_LINES = 60  # Functions listed in the text report
+
+
+class ProfileStore:
+    # The most recent cProfile captures, each kept as a text report and as the
+    # marshalled stats that pstats.Stats / snakeviz load from a .pstats file
+    def __init__(self, max_profiles=50):
+        self._lock = threading.Lock()
+        self._profiles = OrderedDict()
+        self._max_profiles = max_profiles
+
+    def add(self, profiler, method, path, status):
+        stats = pstats.Stats(profiler)
+        report = io.StringIO()
+        stats.stream = report
+        stats.sort_stats('cumulative').print_stats(PROFILE_LINES)
+        profile_id = uuid.uuid4().hex
+        profile = {
+            'id': profile_id,
+            'method': method,
+            'path': path,
+            'status': status,
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'seconds': stats.total_tt,
+            'calls': stats.total_calls,
+            'report': report.getvalue(),
+            'pstats': marshal.dumps(stats.stats),
+        }
+        with self._lock:
+            self._profiles[profile_id] = profile
+            while len(self._profiles) > self._max_profiles:
+                self._profiles.popitem(last=False)
+        return profile_id
+
+    def get(self, profile_id):
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def list(self):
+        with self._lock:
+            return [{key: value for key, value in profile.items() if key not in ('report', 'pstats')}
+                    for profile in reversed(self._profiles.values())]
+
+
+profile_store = ProfileStore()
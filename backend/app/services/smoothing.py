@@ -0,0 +1,43 @@
+import numpy as np
+
+
+def window_lengths(length, windows):
+    # The window adjustment smooth_data applies: odd, and no longer than the series
+    adjusted = []
+    for window in windows:
+        if length < window:
+            window = length if length % 2 != 0 else length - 1
+        elif window % 2 == 0:
+            window += 1
+        adjusted.append(window)
+    return adjusted
+
+
+def _edge_fit(values, at):
+    # Straight line fitted to values over their index, evaluated at the positions `at`
+    x = np.arange(len(values))
+    x_mean = x.mean()
+    y_mean = values.mean()
+    slope = np.dot(x - x_mean, values - y_mean) / np.dot(x - x_mean, x - x_mean)
+    return y_mean + slope * (at - x_mean)
+
+
+def moving_linear_smooth(values, windows):
+    # Savitzky-Golay smoothing with polyorder 1 for several windows in one pass, one row per window.
+    # A degree-1 fit evaluated at the centre of a symmetric window is just the window mean, so the
+    # interior of every row comes from one shared prefix sum. The first and last half windows use a
+    # line fitted to the first/last full window, like savgol_filter's default 'interp' mode.
+    # A series shorter than 3 rows has no window to fit a line in; its rows are all NaN.
+    values = np.asarray(values, dtype=float)
+    length = len(values)
+    sums = np.concatenate(([0.0], np.cumsum(values)))
+    smoothed = np.empty((len(windows), length))
+    for row, window in enumerate(window_lengths(length, windows)):
+        if window < 3:
+            smoothed[row] = np.nan
+            continue
+        half = window // 2
+        smoothed[row, half:length - half] = (sums[window:] - sums[:length - window + 1]) / window
+        smoothed[row, :half] = _edge_fit(values[:window], np.arange(half))
+        smoothed[row, length - half:] = _edge_fit(values[-window:], np.arange(window - half, window))
+    return smoothed
@@ -0,0 +1,115 @@
+import os
+import glob
+import logging
+import gzip
+import tempfile
+import threading
+from flask import jsonify
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; without it only gzip variants are written
+    brotli = None
+from .cache import data_signature, data_version
+from .metrics import timed
+from .data_processing import process_etf_data_dt, process_etf_data_chart, process_etf_data_chart_columnar
+from .jobs import job_queue
+
+# Response bodies of the read endpoints, written once per data version as
+# <snapshot_directory>/<name>-<version>.json and served straight from disk
+SNAPSHOT_BUILDERS = {
+    'etfs': process_etf_data_dt,
+    'chart_data': process_etf_data_chart,
+    'chart_data_columnar': process_etf_data_chart_columnar,
+}
+
+# Pre-compressed variants written next to each snapshot, in server preference order
+ENCODING_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+# A missing snapshot is built on the request that needs it, so compression has to stay
+# fast: brotli 5 compresses the full /api/etfs body in tens of milliseconds where 11 takes seconds
+BROTLI_QUALITY = 5
+GZIP_LEVEL = 9
+
+# Concurrent requests for a missing snapshot wait for one build instead of each running it.
+# Locks are per name, so a request only waits for the build of the body it serves.
+_build_locks = {name: threading.Lock() for name in SNAPSHOT_BUILDERS}
+
+
+@timed('serialize')
+def serialize_json(data):
+    return jsonify(data).get_data()
+
+
+def snapshot_path(snapshot_directory, name, version):
+    # Absolute, since send_file resolves relative paths against the app package
+    return os.path.abspath(os.path.join(snapshot_directory, f"{name}-{version}.json"))
+
+
+def remove_stale_snapshots(snapshot_directory, name, keep):
+    keep = {keep} | {keep + suffix for suffix in ENCODING_SUFFIXES.values()}
+    for path in glob.glob(os.path.join(os.path.abspath(snapshot_directory), f"{name}-*.json*")):
+        if path not in keep:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def compress(body, encoding):
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    if encoding == 'br' and brotli is not None:
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return None
+
+
+def write_atomic(path, body):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(body)
+    os.replace(tmp_path, path)
+
+
+def available_encodings(path):
+    return [encoding for encoding, suffix in ENCODING_SUFFIXES.items() if os.path.exists(path + suffix)]
+
+
+def ensure_snapshot(name, directory, snapshot_directory, version=None):
+    # Needs an app context (serialize_json uses jsonify)
+    if version is None:
+        version = data_version(data_signature(directory))
+    path = snapshot_path(snapshot_directory, name, version)
+    if os.path.exists(path):
+        return path
+    with _build_locks[name]:
+        if os.path.exists(path):
+            return path
+        # Nothing is kept in memory: once written, the files serve every request for this version
+        body = serialize_json(SNAPSHOT_BUILDERS[name](directory))
+        os.makedirs(snapshot_directory, exist_ok=True)
+        # Variants go first so the plain file, whose existence marks the
+        # snapshot as built, never appears without them
+        for encoding, suffix in ENCODING_SUFFIXES.items():
+            compressed = compress(body, encoding)
+            if compressed is not None:
+                write_atomic(path + suffix, compressed)
+        write_atomic(path, body)
+        remove_stale_snapshots(snapshot_directory, name, keep=path)
+    logging.info(f"Wrote snapshot {path} ({len(body)} bytes)")
+    return path
+
+
+def build_snapshots(directory, snapshot_directory):
+    return {name: ensure_snapshot(name, directory, snapshot_directory) for name in SNAPSHOT_BUILDERS}
+
+
+def schedule_snapshot_build(app):
+    # Rebuilds every snapshot on the job queue, off the request thread
+    directory = app.config['DATA_DIRECTORY']
+    snapshot_directory = app.config['SNAPSHOT_DIRECTORY']
+
+    def build(report):
+        with app.app_context():
+            return build_snapshots(directory, snapshot_directory)
+
+    return job_queue.submit('snapshots', build, total=len(SNAPSHOT_BUILDERS))
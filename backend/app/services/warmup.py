@@ -0,0 +1,35 @@
+import time
+import logging
+import importlib
+from .jobs import job_queue
+from .cache import data_signature
+from .data_processing import get_symbol_artifact
+
+# Heavy modules the services import on first use instead of at startup
+LAZY_MODULES = ('scipy.signal', 'yfinance', 'pyarrow')
+
+
+def warm_up(directory, modules=LAZY_MODULES):
+    # Imports the lazily loaded modules and computes every symbol's artifact, so the
+    # first real request pays for neither. Returns seconds spent per step.
+    timings = {}
+    for name in modules:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            continue  # Optional dependencies that are not installed stay unavailable
+        timings[name] = time.perf_counter() - start
+    start = time.perf_counter()
+    for etf_name, file_signature in data_signature(directory).items():
+        get_symbol_artifact(directory, etf_name, file_signature)
+    timings['artifacts'] = time.perf_counter() - start
+    logging.info(f"Warm-up finished: {', '.join(f'{name} {seconds:.3f}s' for name, seconds in timings.items())}")
+    return timings
+
+
+def schedule_warm_up(app):
+    # Runs warm_up on the job queue, off the startup path
+    directory = app.config['DATA_DIRECTORY']
+    modules = app.config['WARM_UP_MODULES']
+    return job_queue.submit('warm_up', lambda report: warm_up(directory, modules))
@@ -0,0 +1,215 @@
+## Times the data-processing pipeline and both ETF endpoints on a synthetic universe
+## of Date,Close CSVs generated into a temporary data directory, plus the app's
+## cold start (imports and create_app in a fresh interpreter, with its peak RSS),
+## and writes the timings as JSON so runs can be compared against each other.
+## TO RUN (from backend/):
+## python benchmark.py [--symbols 50] [--rows 5000] [--gaps 0.02] [--nans 0.001]
+##                     [--repeat 5] [--output benchmark_results.json]
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+from flask import jsonify
+
+from app import create_app
+from app.services import data_processing
+from app.services.cache import data_signature, result_cache, symbol_cache
+from app.services.etf_store import read_csv_columns, read_columns, to_day_numbers, migrate_directory
+from app.services.detrending import _trend_basis
+
+
+def generate_universe(directory, symbols, rows, gaps, nans, seed):
+    # Random-walk closes on business days. Each symbol starts on a different day so
+    # histories are ragged, `gaps` of the days are dropped and `nans` of the closes are blank.
+    rng = np.random.default_rng(seed)
+    days = pd.bdate_range('1990-01-01', periods=rows + rows // 4)
+    for index in range(symbols):
+        offset = int(rng.integers(0, rows // 4 + 1))
+        dates = days[offset:offset + rows]
+        keep = rng.random(len(dates)) >= gaps
+        dates = dates[keep]
+        closes = 50 * np.exp(np.cumsum(rng.normal(0.0003, 0.012, len(dates))))
+        closes[rng.random(len(dates)) < nans] = np.nan
+        frame = pd.DataFrame({'Date': dates.strftime('%Y-%m-%d'), 'Close': np.round(closes, 4)})
+        frame.to_csv(os.path.join(directory, f"SYN{index:04d}.csv"), index=False)
+
+
+def time_stage(func, repeat, setup=None):
+    # Wall-clock seconds of each run
+    runs = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - start)
+    return {
+        'runs': len(runs),
+        'min': min(runs),
+        'median': statistics.median(runs),
+        'mean': statistics.mean(runs),
+        'max': max(runs),
+    }
+
+
+STARTUP_SCRIPT = """
+import json, resource, sys, time
+started = time.perf_counter()
+from app import create_app
+create_app({'BUILD_SNAPSHOTS_ON_STARTUP': False, 'LOG_FILE': sys.argv[1]})
+seconds = time.perf_counter() - started
+try:
+    # Peak RSS of this process image; ru_maxrss would include the parent's peak from before exec
+    with open('/proc/self/status') as f:
+        max_rss_kb = next(int(line.split()[1]) for line in f if line.startswith('VmHWM:'))
+except OSError:
+    max_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({'seconds': seconds,
+                  'max_rss_kb': max_rss_kb,
+                  'modules': sorted(m for m in ('scipy', 'yfinance', 'pyarrow', 'pandas') if m in sys.modules)}))
+"""
+
+
+def measure_startup(workspace, repeat):
+    # Import and create_app in a fresh interpreter each run, so nothing is already imported
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT, os.path.join(workspace, 'startup.log')],
+                                cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True, text=True, check=True).stdout
+        runs.append(json.loads(output))
+    seconds = [run['seconds'] for run in runs]
+    timing = {'runs': len(runs), 'min': min(seconds), 'median': statistics.median(seconds),
+              'mean': statistics.mean(seconds), 'max': max(seconds)}
+    return timing, {'max_rss_kb': max(run['max_rss_kb'] for run in runs), 'modules': runs[0]['modules']}
+
+
+def clear_caches():
+    result_cache.clear()
+    symbol_cache.clear()
+    _trend_basis.cache_clear()  # QR factorisations per series length
+
+
+def run_benchmarks(directory, snapshot_directory, repeat):
+    symbols = sorted(data_signature(directory))
+    stages = {}
+
+    csv_columns = {}
+    def read_csv():
+        for symbol in symbols:
+            csv_columns[symbol] = pd.read_csv(os.path.join(directory, f"{symbol}.csv"))
+    stages['read_csv'] = time_stage(read_csv, repeat)
+
+    def parse():
+        for frame in csv_columns.values():
+            to_day_numbers(frame['Date'])
+    stages['parse_dates'] = time_stage(parse, repeat)
+
+    columns = {symbol: read_csv_columns(directory, symbol) for symbol in symbols}
+    closes = [data_processing.clean_symbol_columns(*columns[symbol])[1] for symbol in symbols]
+
+    def detrend():
+        for symbol, values in zip(symbols, closes):
+            data_processing.detrend_data_norm(values, symbol)
+    stages['detrend'] = time_stage(detrend, repeat)
+
+    normalized = [np.asarray(data_processing.detrend_data_norm(values, symbol))
+                  for symbol, values in zip(symbols, closes)]
+    # smooth_data imports scipy.signal on first use; keep that import out of the first timed run
+    import scipy.signal  # noqa: F401
+    def smooth_each_window():
+        for values in normalized:
+            for window in data_processing.SMOOTHING_WINDOWS:
+                data_processing.smooth_data(values, window, 1)
+    stages['smooth_per_window'] = time_stage(smooth_each_window, repeat)
+    def smooth_all_windows():
+        for values in normalized:
+            data_processing.moving_linear_smooth(values, data_processing.SMOOTHING_WINDOWS)
+    stages['smooth_multi_window'] = time_stage(smooth_all_windows, repeat)
+
+    migrate_directory(directory)
+    def read_col():
+        for symbol in symbols:
+            days, values = read_columns(directory, symbol)
+            np.asarray(days).sum(), np.asarray(values).sum()  # Touch the pages, memmap reads lazily
+    stages['read_columnar'] = time_stage(read_col, repeat)
+
+    app = create_app({
+        'DATA_DIRECTORY': directory,
+        'SNAPSHOT_DIRECTORY': snapshot_directory,
+        'BUILD_SNAPSHOTS_ON_STARTUP': False,
+        'LOG_FILE': os.path.join(os.path.dirname(directory), 'app.log'),
+    })
+    for name, process in (('dt', data_processing.process_etf_data_dt),
+                          ('chart', data_processing.process_etf_data_chart)):
+        stages[f"assemble_{name}_cold"] = time_stage(lambda: process(directory), repeat, setup=clear_caches)
+        stages[f"assemble_{name}_warm"] = time_stage(lambda: process(directory), repeat)
+        with app.app_context():
+            data = process(directory)
+            stages[f"serialize_{name}"] = time_stage(lambda: jsonify(data).get_data(), repeat)
+
+    client = app.test_client()
+    def reset_endpoint_state():
+        clear_caches()
+        shutil.rmtree(snapshot_directory, ignore_errors=True)
+    sizes = {}
+    for name, url in (('etfs', '/api/etfs'), ('chart_data', '/api/etfs/chart_data')):
+        def fetch():
+            response = client.get(url)
+            sizes[name] = len(response.get_data())
+        stages[f"endpoint_{name}_cold"] = time_stage(fetch, repeat, setup=reset_endpoint_state)
+        stages[f"endpoint_{name}_warm"] = time_stage(fetch, repeat)
+    return stages, sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the ETF data pipeline on synthetic data')
+    parser.add_argument('--symbols', type=int, default=50, help='number of synthetic symbols')
+    parser.add_argument('--rows', type=int, default=5000, help='business days of history per symbol')
+    parser.add_argument('--gaps', type=float, default=0.02, help='fraction of days dropped from each history')
+    parser.add_argument('--nans', type=float, default=0.001, help='fraction of closes left blank')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5, help='runs per stage')
+    parser.add_argument('--output', default='benchmark_results.json')
+    args = parser.parse_args()
+
+    workspace = tempfile.mkdtemp(prefix='etf_benchmark_')
+    directory = os.path.join(workspace, 'data')
+    snapshot_directory = os.path.join(workspace, 'snapshots')
+    os.makedirs(directory)
+    try:
+        generate_universe(directory, args.symbols, args.rows, args.gaps, args.nans, args.seed)
+        stages, sizes = run_benchmarks(directory, snapshot_directory, args.repeat)
+        stages['startup'], startup = measure_startup(workspace, args.repeat)
+    finally:
+        shutil.rmtree(workspace, ignore_errors=True)
+
+    results = {
+        'created': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'parameters': vars(args),
+        'response_bytes': sizes,
+        'startup': startup,
+        'stages': stages,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    for name, timing in stages.items():
+        print(f"{name:28s} median {timing['median'] * 1000:10.2f} ms   min {timing['min'] * 1000:10.2f} ms")
+    print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,11 @@
+## Converts every CSV in the data directory into the columnar .col format
+## read by app/services/etf_store.py. The CSVs are left in place.
+## TO RUN (from backend/):
+## python migrate_data.py [data_directory]
+import sys
+import logging
+from app.services.etf_store import migrate_directory
+
+if __name__ == '__main__':
+    logging.basicConfig(stream=sys.stdout, level=logging.INFO, format='%(message)s')
+    migrate_directory(sys.argv[1] if len(sys.argv) > 1 else '../data')
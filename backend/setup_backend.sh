@@ -38,8 +38,8 @@ fi
 echo "Pip installed successfully."
 
 # Step 5: Install Flask and dependencies
-echo "Installing Flask, Werkzeug, flask-cors, pandas, yfinance, and scipy..."
-pip install Flask==2.0.3 Werkzeug==2.0.1 flask-cors pandas yfinance scipy
+echo "Installing Flask, Werkzeug, flask-cors, pandas, yfinance, scipy, brotli and pyarrow..."
+pip install Flask==2.0.3 Werkzeug==2.0.1 flask-cors pandas yfinance scipy brotli pyarrow
 
 # Step 6: Check if requirements.txt exists and install requirements
 if [ -f "../requirements.txt" ]; then
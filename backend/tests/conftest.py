@@ -0,0 +1,91 @@
+import gzip
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from app import create_app
+from app.services.fetchers import LocalFetcher
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+REPO_DATA = os.path.join(FIXTURES, '..', '..', '..', 'data')
+
+# What the upstream fixture serves: ten business days of AAA, BBB and CCC
+DAYS = [d.strftime('%Y-%m-%d') for d in pd.bdate_range('2024-01-01', periods=10)]
+UPSTREAM_CLOSES = {symbol: [10.0 * (offset + 1) + i for i in range(len(DAYS))]
+                   for offset, symbol in enumerate(['AAA', 'BBB', 'CCC'])}
+
+
+def fixture_path(name):
+    # 'data' is the repository's own data directory, anything else a set under fixtures/
+    return REPO_DATA if name == 'data' else os.path.join(FIXTURES, name)
+
+
+def golden(name):
+    with open(os.path.join(FIXTURES, 'golden', f"{name}.json.gz"), 'rb') as f:
+        return gzip.decompress(f.read())
+
+
+def write_csv(directory, symbol, rows):
+    with open(os.path.join(directory, f"{symbol}.csv"), 'w') as f:
+        f.write('Date,Close\n')
+        f.writelines(f"{date},{close}\n" for date, close in rows)
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    directory = tmp_path / 'data'
+    directory.mkdir()
+    return directory
+
+
+@pytest.fixture
+def copy_fixture(data_dir):
+    # Copies a fixture data set into the test's own data directory
+    def copy(name):
+        source = fixture_path(name)
+        for filename in os.listdir(source):
+            if filename.endswith('.csv'):
+                shutil.copy(os.path.join(source, filename), data_dir / filename)
+        return data_dir
+    return copy
+
+
+@pytest.fixture
+def make_app(tmp_path, data_dir):
+    def make(**config):
+        return create_app({
+            'DATA_DIRECTORY': str(data_dir),
+            'SNAPSHOT_DIRECTORY': str(tmp_path / 'snapshots'),
+            'BUILD_SNAPSHOTS_ON_STARTUP': False,
+            'LOG_FILE': str(tmp_path / 'app.log'),
+            **config,
+        })
+    return make
+
+
+@pytest.fixture
+def client(make_app):
+    return make_app().test_client()
+
+
+@pytest.fixture
+def synthetic_client(copy_fixture, client):
+    copy_fixture('synthetic')
+    return client
+
+
+@pytest.fixture
+def upstream(tmp_path):
+    # Source directory for a LocalFetcher, standing in for yfinance
+    directory = tmp_path / 'upstream'
+    directory.mkdir()
+    for symbol, closes in UPSTREAM_CLOSES.items():
+        write_csv(directory, symbol, zip(DAYS, closes))
+    return directory
+
+
+@pytest.fixture
+def upstream_client(upstream, make_app):
+    return make_app(ETF_FETCHER=LocalFetcher(str(upstream))).test_client()
@@ -0,0 +1,77 @@
+## Regenerates the synthetic data sets and the golden responses in this directory.
+## The goldens are the JSON the original (pre-vectorization) implementation served,
+## so its data_processing.py is loaded from the baseline commit, not from the tree.
+## TO RUN (from backend/):
+## python tests/fixtures/make_golden.py [baseline_commit]
+import gzip
+import io
+import os
+import shutil
+import subprocess
+import sys
+import types
+import contextlib
+
+import numpy as np
+import pandas as pd
+from flask import Flask, jsonify
+
+FIXTURES = os.path.dirname(os.path.abspath(__file__))
+REPO_DATA = os.path.join(FIXTURES, '..', '..', '..', 'data')
+BASELINE_COMMIT = '645ec07'
+
+
+def write_series(directory, symbol, start, closes):
+    dates = pd.bdate_range(start, periods=len(closes)).strftime('%Y-%m-%d')
+    pd.DataFrame({'Date': dates, 'Close': closes}).to_csv(os.path.join(directory, f"{symbol}.csv"), index=False)
+
+
+def generate_synthetic(directory):
+    # Ragged histories with missing closes, a zero close, and two equal-length symbols
+    rng = np.random.default_rng(1)
+    for index, length in enumerate((60, 450, 700, 1300)):
+        closes = np.round(np.cumsum(rng.normal(0, 1, length)) + 100, 3)
+        closes[rng.integers(0, length, 5)] = np.nan
+        if index == 1:
+            closes[3] = 0.0
+        write_series(directory, f"S{index}", f"200{index}-01-01", closes)
+    for symbol in ('EQA', 'EQB'):
+        write_series(directory, symbol, '2010-01-01', np.round(np.cumsum(rng.normal(0, 1, 800)) + 80, 3))
+
+
+def generate_short(directory):
+    # A freshly listed symbol with two rows next to an established one
+    rng = np.random.default_rng(2)
+    write_series(directory, 'LONG', '2015-01-01', np.round(np.cumsum(rng.normal(0, 1, 1000)) + 100, 3))
+    write_series(directory, 'SHORT', '2018-10-01', [25.125, 25.5])
+
+
+def load_baseline(commit):
+    source = subprocess.run(['git', 'show', f"{commit}:backend/app/services/data_processing.py"],
+                            capture_output=True, text=True, check=True).stdout
+    module = types.ModuleType('baseline_data_processing')
+    exec(compile(source, 'baseline_data_processing.py', 'exec'), module.__dict__)
+    return module
+
+
+def write_golden(name, data):
+    with Flask(__name__).app_context():
+        body = jsonify(data).get_data()
+    with open(os.path.join(FIXTURES, 'golden', f"{name}.json.gz"), 'wb') as f:
+        f.write(gzip.compress(body, mtime=0))
+
+
+if __name__ == '__main__':
+    baseline = load_baseline(sys.argv[1] if len(sys.argv) > 1 else BASELINE_COMMIT)
+    for name, generate in (('synthetic', generate_synthetic), ('short', generate_short)):
+        directory = os.path.join(FIXTURES, name)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+        generate(directory)
+    os.makedirs(os.path.join(FIXTURES, 'golden'), exist_ok=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        for name, directory in (('data', REPO_DATA), ('synthetic', os.path.join(FIXTURES, 'synthetic')),
+                                ('short', os.path.join(FIXTURES, 'short'))):
+            write_golden(f"{name}_etfs", baseline.process_etf_data_dt(directory))
+            if name != 'short':  # The original chart endpoint failed on a two-row history
+                write_golden(f"{name}_chart_data", baseline.process_etf_data_chart(directory))
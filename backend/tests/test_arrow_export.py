@@ -0,0 +1,92 @@
+import json
+
+import numpy as np
+import pytest
+
+from app import routes
+from app.services.arrow_export import ARROW_FIELDS, ARROW_STREAM_MIMETYPE
+from app.services.cache import data_signature
+from app.services.data_processing import get_symbol_artifact, symbol_smoothed
+from app.services.etf_store import parse_day
+
+pa = pytest.importorskip('pyarrow')
+
+
+def read_stream(response):
+    assert response.status_code == 200
+    assert response.mimetype == ARROW_STREAM_MIMETYPE
+    return pa.ipc.open_stream(response.get_data())
+
+
+def expected_columns(artifact):
+    series = [artifact['close'], artifact['normalized_close'], artifact['detrended'],
+              artifact['normalized_detrended']] + list(symbol_smoothed(artifact))
+    return dict(zip(ARROW_FIELDS, series))
+
+
+def batches_by_symbol(reader):
+    # One batch per symbol, in the order of the schema's symbols metadata
+    symbols = json.loads(reader.schema.metadata[b'symbols'])
+    batches = dict(zip(symbols, reader))
+    assert len(batches) == len(symbols)
+    for name, batch in batches.items():
+        assert set(batch.column('symbol').dictionary_decode().to_pylist()) <= {name}
+    return batches
+
+
+@pytest.fixture
+def artifacts(synthetic_client, data_dir):
+    return {etf_name: get_symbol_artifact(str(data_dir), etf_name, file_signature)
+            for etf_name, file_signature in data_signature(str(data_dir)).items()}
+
+
+def test_stream_matches_symbol_artifacts(synthetic_client, artifacts):
+    reader = read_stream(synthetic_client.get('/api/etfs/chart_data?format=arrow'))
+    schema = reader.schema
+    assert schema.names == ['symbol', 'date', *ARROW_FIELDS]
+    assert json.loads(schema.metadata[b'symbols']) == list(artifacts)
+    assert json.loads(schema.metadata[b'min_max']) == {
+        name: {'min': artifact['min'], 'max': artifact['max']} for name, artifact in artifacts.items()}
+
+    batches = batches_by_symbol(reader)
+    assert list(batches) == list(artifacts)
+    for name, artifact in artifacts.items():
+        batch = batches[name]
+        np.testing.assert_array_equal(batch.column('date').cast(pa.int32()).to_numpy(), artifact['days'])
+        for field, values in expected_columns(artifact).items():
+            np.testing.assert_array_equal(batch.column(field).to_numpy(), values)
+
+
+def test_start_and_end_slice_daily_rows(synthetic_client, artifacts):
+    url = '/api/etfs/chart_data?format=arrow&symbols=S0,S1,S2&start=2002-02&end=2002-03-10'
+    start, end = parse_day('2002-02'), parse_day('2002-03-10', end=True)
+    batches = batches_by_symbol(read_stream(synthetic_client.get(url)))
+    assert list(batches) == ['S0', 'S1', 'S2']
+    assert batches['S0'].num_rows == 0  # S0 ends in 2000
+    for name, batch in batches.items():
+        artifact = artifacts[name]
+        rows = (artifact['days'] >= start) & (artifact['days'] <= end)
+        np.testing.assert_array_equal(batch.column('date').cast(pa.int32()).to_numpy(), artifact['days'][rows])
+        np.testing.assert_array_equal(batch.column('close').to_numpy(), artifact['close'][rows])
+
+
+def test_max_points_keeps_endpoints(synthetic_client, artifacts):
+    batches = batches_by_symbol(read_stream(synthetic_client.get('/api/etfs/chart_data?format=arrow&max_points=10')))
+    for name, artifact in artifacts.items():
+        days = batches[name].column('date').cast(pa.int32()).to_numpy()
+        assert len(days) == min(10, len(artifact['days']))
+        assert days[0] == artifact['days'][0] and days[-1] == artifact['days'][-1]
+        assert np.all(np.diff(days) > 0)
+
+
+def test_accept_header_selects_arrow(synthetic_client):
+    response = synthetic_client.get('/api/etfs/chart_data', headers={'Accept': ARROW_STREAM_MIMETYPE})
+    assert read_stream(response).schema.names[:2] == ['symbol', 'date']
+    assert 'Accept' in response.headers['Vary']
+    json_response = synthetic_client.get('/api/etfs/chart_data', headers={'Accept': 'application/json'})
+    assert json_response.mimetype == 'application/json'
+
+
+def test_missing_pyarrow_is_406(synthetic_client, monkeypatch):
+    monkeypatch.setattr(routes, 'load_pyarrow', lambda: None)
+    assert synthetic_client.get('/api/etfs/chart_data?format=arrow').status_code == 406
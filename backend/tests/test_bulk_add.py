@@ -0,0 +1,35 @@
+import pytest
+
+from conftest import DAYS
+from app.services.fetchers import LocalFetcher
+
+
+def test_bulk_add_reports_each_symbol_in_order(data_dir, upstream_client):
+    response = upstream_client.post('/api/etfs/add_bulk', json={'symbols': ['CCC', 'MISSING', 'AAA', 'CCC']})
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert [(r['symbol'], r['status']) for r in results] == [('CCC', 'ok'), ('MISSING', 'not_found'), ('AAA', 'ok')]
+    assert [r['rows'] for r in results] == [10, 0, 10]
+    assert sorted(path.name for path in data_dir.glob('*.csv')) == ['AAA.csv', 'CCC.csv']
+
+    etfs = upstream_client.get('/api/etfs').get_json()
+    assert sorted(etfs) == DAYS
+    assert all(sorted(row) == ['AAA', 'CCC'] for row in etfs.values())
+
+
+def test_bulk_add_matches_single_adds(tmp_path, upstream, upstream_client, make_app):
+    upstream_client.post('/api/etfs/add_bulk', json={'symbols': ['AAA', 'BBB']})
+    bulk = upstream_client.get('/api/etfs').get_data()
+
+    single_dir = tmp_path / 'single'
+    single_dir.mkdir()
+    single = make_app(ETF_FETCHER=LocalFetcher(str(upstream)), DATA_DIRECTORY=str(single_dir),
+                      SNAPSHOT_DIRECTORY=str(tmp_path / 'single_snapshots')).test_client()
+    for symbol in ['AAA', 'BBB']:
+        assert single.post('/api/etfs/add', json={'symbol': symbol}).status_code == 200
+    assert single.get('/api/etfs').get_data() == bulk
+
+
+@pytest.mark.parametrize('body', [None, {}, {'symbols': []}, {'symbols': 'AAA'}, {'symbols': ['AAA', '']}])
+def test_bulk_add_rejects_missing_symbols(client, body):
+    assert client.post('/api/etfs/add_bulk', json=body).status_code == 400
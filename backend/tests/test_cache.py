@@ -0,0 +1,61 @@
+import os
+
+import pytest
+
+from app.services.cache import result_cache, symbol_cache
+
+
+@pytest.fixture(autouse=True)
+def empty_caches():
+    # Both caches are process-wide
+    result_cache.clear()
+    symbol_cache.clear()
+
+
+def cache_stats(client):
+    response = client.get('/api/cache/stats')
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def delta(before, after):
+    return {group: {key: after[group][key] - before[group][key] for key in after[group]} for group in after}
+
+
+def touch(path):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_repeat_request_hits_and_a_changed_file_invalidates(synthetic_client, data_dir):
+    start = cache_stats(synthetic_client)
+    synthetic_client.get('/api/etfs?limit=5')
+    first = cache_stats(synthetic_client)
+    assert delta(start, first)['results'] == {'hits': 0, 'misses': 1, 'invalidations': 0, 'entries': 1}
+
+    synthetic_client.get('/api/etfs?limit=5')
+    second = cache_stats(synthetic_client)
+    assert delta(first, second)['results'] == {'hits': 1, 'misses': 0, 'invalidations': 0, 'entries': 0}
+    assert delta(first, second)['symbols']['misses'] == 0
+
+    touch(data_dir / 'S0.csv')
+    synthetic_client.get('/api/etfs?limit=5')
+    third = cache_stats(synthetic_client)
+    assert delta(second, third)['results'] == {'hits': 0, 'misses': 1, 'invalidations': 1, 'entries': 0}
+
+
+def test_changed_file_only_recomputes_its_symbol(synthetic_client, data_dir):
+    synthetic_client.get('/api/etfs?symbols=S0,S1')
+    before = cache_stats(synthetic_client)
+    touch(data_dir / 'S0.csv')
+    synthetic_client.get('/api/etfs?symbols=S0,S1')
+    after = cache_stats(synthetic_client)
+    changes = delta(before, after)['symbols']
+    # S0's artifact and rows are recomputed, S1's are reused
+    assert changes['misses'] == 2 and changes['hits'] == 2
+
+
+def test_snapshots_are_not_held_in_memory(synthetic_client):
+    synthetic_client.get('/api/etfs')
+    synthetic_client.get('/api/etfs/chart_data')
+    assert cache_stats(synthetic_client)['results']['entries'] == 0
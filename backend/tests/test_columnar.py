@@ -0,0 +1,30 @@
+import pytest
+
+from app.services.data_processing import CHART_FIELDS
+
+
+@pytest.mark.parametrize('query', ['', '&symbols=S1,S2&start=2002-02&end=2003-06', '&resample=ohlc', '&max_points=12'])
+def test_columnar_matches_chart_rows(synthetic_client, query):
+    rows = synthetic_client.get(f"/api/etfs/chart_data?{query}").get_json()
+    columnar = synthetic_client.get(f"/api/etfs/chart_data?format=columnar{query}").get_json()
+    data = rows['data']
+    assert columnar['dates'] == sorted(data)
+    assert columnar['min_max'] == rows['min_max']
+    assert sorted(columnar['symbols']) == sorted(rows['min_max'])
+
+    gaps = 0
+    for symbol in columnar['symbols']:
+        for field in CHART_FIELDS:
+            values = columnar['series'][symbol][field]
+            assert len(values) == len(columnar['dates'])
+            for date, value in zip(columnar['dates'], values):
+                if symbol in data[date]:
+                    assert value == data[date][symbol][CHART_FIELDS.index(field)]
+                else:
+                    assert value is None
+                    gaps += 1
+    assert gaps  # The synthetic symbols cover different years
+
+
+def test_unsupported_format_is_400(synthetic_client):
+    assert synthetic_client.get('/api/etfs/chart_data?format=csv').status_code == 400
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from app.services.cache import symbol_cache
+from app.services.detrending import polynomial_trend, _trend_basis
+
+
+def test_trend_depends_only_on_the_series():
+    # Equal-length series share the cached factorisation, but not each other's results
+    rng = np.random.default_rng(3)
+    series = [np.cumsum(rng.normal(0, 1, 500)) + 100 for _ in range(4)]
+    _trend_basis.cache_clear()
+    alone = polynomial_trend(series[0])
+    for values in series[1:]:
+        polynomial_trend(values)
+    assert np.array_equal(polynomial_trend(series[0]), alone)
+
+
+def test_equal_length_symbols_do_not_change_each_other(copy_fixture, client):
+    copy_fixture('synthetic')
+    full = client.get('/api/etfs').get_json()
+    symbol_cache.clear()  # Fit EQA again, this time without EQB
+    alone = client.get('/api/etfs?symbols=EQA').get_json()
+    assert alone == {date: {'EQA': row['EQA']} for date, row in full.items() if 'EQA' in row}
+
+
+def test_trend_matches_polyfit():
+    rng = np.random.default_rng(4)
+    values = np.cumsum(rng.normal(0, 1, 2000)) + 50
+    x = np.arange(len(values))
+    np.testing.assert_allclose(polynomial_trend(values), np.poly1d(np.polyfit(x, values, 3))(x), rtol=1e-12)
+
+
+@pytest.mark.filterwarnings('ignore:Polyfit may be poorly conditioned')
+def test_trend_of_very_short_series():
+    assert np.allclose(polynomial_trend([25.125, 25.5]), [25.125, 25.5])
@@ -0,0 +1,66 @@
+import math
+
+import numpy as np
+import pytest
+
+from app.services.downsampling import lttb_indices
+
+
+def reference_lttb(y, threshold):
+    # The textbook loop, one bucket at a time
+    n = len(y)
+    every = (n - 2) / (threshold - 2)
+    selected = [0]
+    a = 0
+    for i in range(threshold - 2):
+        avg_start = int(math.floor((i + 1) * every)) + 1
+        avg_end = min(int(math.floor((i + 2) * every)) + 1, n)
+        avg_x = sum(range(avg_start, avg_end)) / (avg_end - avg_start)
+        avg_y = sum(y[avg_start:avg_end]) / (avg_end - avg_start)
+        lo = int(math.floor(i * every)) + 1
+        hi = int(math.floor((i + 1) * every)) + 1
+        areas = [abs((a - avg_x) * (y[j] - y[a]) - (a - j) * (avg_y - y[a])) for j in range(lo, hi)]
+        a = lo + int(np.argmax(areas))
+        selected.append(a)
+    return selected + [n - 1]
+
+
+@pytest.mark.parametrize('n, threshold', [(10, 3), (100, 7), (1000, 50), (997, 333), (500, 499)])
+def test_matches_reference(n, threshold):
+    y = np.cumsum(np.random.default_rng(n).normal(size=n))
+    selected = lttb_indices(y, threshold)
+    assert selected.tolist() == reference_lttb(y.tolist(), threshold)
+    assert selected[0] == 0 and selected[-1] == n - 1
+    assert np.all(np.diff(selected) > 0)
+
+
+def test_keeps_everything_below_threshold():
+    assert lttb_indices(np.arange(5.0), 5).tolist() == [0, 1, 2, 3, 4]
+    assert lttb_indices(np.arange(5.0), None).tolist() == [0, 1, 2, 3, 4]
+
+
+def test_rejects_threshold_below_three():
+    with pytest.raises(ValueError):
+        lttb_indices(np.arange(10.0), 2)
+
+
+def test_picks_the_spike():
+    y = np.zeros(101)
+    y[37] = 10.0
+    assert 37 in lttb_indices(y, 5).tolist()
+
+
+def test_max_points_bounds_months_per_symbol(copy_fixture, client):
+    copy_fixture('short')
+    full = client.get('/api/etfs/chart_data?symbols=LONG').get_json()['data']
+    sampled = client.get('/api/etfs/chart_data?symbols=LONG&max_points=12').get_json()['data']
+    months = sorted(full)
+    assert len(months) > 12
+    assert len(sampled) == 12
+    assert min(sampled) == months[0] and max(sampled) == months[-1]
+    assert all(sampled[month] == full[month] for month in sampled)
+
+
+@pytest.mark.parametrize('value', ['2', '0', '-5', 'ten'])
+def test_invalid_max_points_is_400(client, value):
+    assert client.get(f"/api/etfs/chart_data?max_points={value}").status_code == 400
@@ -0,0 +1,51 @@
+import pytest
+
+from conftest import write_csv
+
+URLS = ['/api/etfs', '/api/etfs/chart_data', '/api/etfs/chart_data?symbols=S0&max_points=50']
+
+
+@pytest.mark.parametrize('url', URLS)
+def test_matching_etag_is_304_without_body(synthetic_client, url):
+    first = synthetic_client.get(url)
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    assert 'max-age' in first.headers['Cache-Control']
+
+    again = synthetic_client.get(url, headers={'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.get_data() == b''
+    assert again.headers['ETag'] == etag
+
+
+@pytest.mark.parametrize('url', URLS)
+def test_etag_changes_when_data_changes(synthetic_client, data_dir, url):
+    etag = synthetic_client.get(url).headers['ETag']
+    write_csv(data_dir, 'S0', [('2024-01-01', 1.0), ('2024-01-02', 2.0), ('2024-01-03', 3.0), ('2024-01-04', 5.0)])
+    response = synthetic_client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_each_encoding_gets_its_own_etag(synthetic_client):
+    plain = synthetic_client.get('/api/etfs', headers={'Accept-Encoding': 'identity'})
+    compressed = synthetic_client.get('/api/etfs', headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert plain.headers['ETag'] != compressed.headers['ETag']
+    revalidated = synthetic_client.get('/api/etfs', headers={'Accept-Encoding': 'gzip', 'If-None-Match': compressed.headers['ETag']})
+    assert revalidated.status_code == 304
+
+
+def test_etag_depends_on_the_query(synthetic_client):
+    urls = ['/api/etfs?symbols=S0', '/api/etfs?symbols=S1', '/api/etfs?symbols=S0&start=2000-01']
+    tags = {synthetic_client.get(url).headers['ETag'] for url in urls}
+    assert len(tags) == 3
+
+
+@pytest.mark.parametrize('path', ['/api/etfs', '/api/etfs/chart_data', '/api/etfs/chart_data?format=columnar'])
+def test_symbol_order_does_not_change_the_response(synthetic_client, path):
+    separator = '&' if '?' in path else '?'
+    first = synthetic_client.get(f"{path}{separator}symbols=S1,EQA,S0")
+    second = synthetic_client.get(f"{path}{separator}symbols=S0,S1,EQA,S1", headers={'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 304
+    assert synthetic_client.get(f"{path}{separator}symbols=EQA,S0,S1").get_data() == first.get_data()
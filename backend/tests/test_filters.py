@@ -0,0 +1,40 @@
+import pytest
+
+from conftest import write_csv
+
+ROWS = [('2020-01-02', 10.0), ('2020-01-03', 11.0), ('2020-02-03', 12.0), ('2020-03-02', 13.0)]
+
+
+@pytest.fixture
+def two_symbols(data_dir):
+    write_csv(data_dir, 'AAA', ROWS)
+    write_csv(data_dir, 'BBB', ROWS[1:])
+    return data_dir
+
+
+def test_symbols_and_date_range(two_symbols, client):
+    data = client.get('/api/etfs?symbols=BBB&start=2020-01-03&end=2020-02').get_json()
+    assert sorted(data) == ['2020-01-03', '2020-02-03']
+    assert all(list(etfs) == ['BBB'] for etfs in data.values())
+
+
+@pytest.mark.parametrize('query', ['symbols=../src/QQQ', 'symbols=AAA,..%2FAAA', 'symbols=a/b', 'start=2020-13', 'start=yesterday'])
+def test_invalid_filters_are_rejected(two_symbols, client, query):
+    assert client.get(f"/api/etfs?{query}").status_code == 400
+    assert client.get(f"/api/etfs/chart_data?{query}").status_code == 400
+
+
+def test_symbols_outside_data_directory_are_not_served(tmp_path, two_symbols, client):
+    outside = tmp_path / 'src'
+    outside.mkdir()
+    write_csv(outside, 'QQQ', ROWS)
+    assert client.get('/api/etfs?symbols=../src/QQQ').status_code == 400
+
+
+@pytest.mark.parametrize('url, body', [
+    ('/api/etfs/add', {'symbol': '../escape'}),
+    ('/api/etfs/add_bulk', {'symbols': ['AAA', '../escape']}),
+])
+def test_add_rejects_path_like_symbols(tmp_path, two_symbols, upstream_client, url, body):
+    write_csv(tmp_path, 'escape', ROWS)
+    assert upstream_client.post(url, json=body).status_code == 400
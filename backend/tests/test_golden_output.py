@@ -0,0 +1,46 @@
+# The read endpoints must serve exactly the bytes the original iterrows implementation
+# did. The goldens under fixtures/golden were produced by it (see fixtures/make_golden.py).
+import os
+
+import pytest
+
+from conftest import golden, fixture_path
+
+CASES = [
+    ('data', 'etfs'),
+    ('data', 'chart_data'),
+    ('synthetic', 'etfs'),
+    ('synthetic', 'chart_data'),
+]
+URLS = {'etfs': '/api/etfs', 'chart_data': '/api/etfs/chart_data'}
+
+
+@pytest.mark.parametrize('data_set, endpoint', CASES)
+def test_snapshot_matches_baseline(copy_fixture, client, data_set, endpoint):
+    copy_fixture(data_set)
+    response = client.get(URLS[endpoint])
+    assert response.status_code == 200
+    assert response.get_data() == golden(f"{data_set}_{endpoint}")
+
+
+@pytest.mark.parametrize('data_set, endpoint', CASES)
+def test_filtered_path_matches_baseline(copy_fixture, client, data_set, endpoint):
+    # Naming every symbol goes through the filtered (non-snapshot) path
+    copy_fixture(data_set)
+    symbols = ','.join(sorted(f[:-4] for f in os.listdir(fixture_path(data_set)) if f.endswith('.csv')))
+    response = client.get(f"{URLS[endpoint]}?symbols={symbols}")
+    assert response.status_code == 200
+    assert response.get_data() == golden(f"{data_set}_{endpoint}")
+
+
+@pytest.mark.parametrize('data_set', ['data', 'synthetic'])
+def test_columnar_store_matches_baseline(copy_fixture, client, data_set):
+    # Same bytes when the symbols are read from migrated .col files
+    from app.services.etf_store import migrate_directory
+    directory = copy_fixture(data_set)
+    migrate_directory(str(directory))
+    for filename in os.listdir(directory):
+        if filename.endswith('.csv'):
+            os.remove(directory / filename)
+    assert client.get('/api/etfs').get_data() == golden(f"{data_set}_etfs")
+    assert client.get('/api/etfs/chart_data').get_data() == golden(f"{data_set}_chart_data")
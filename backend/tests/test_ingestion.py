@@ -0,0 +1,55 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from conftest import write_csv, DAYS, UPSTREAM_CLOSES
+from app.services.etf_store import csv_path, load_symbol, day_strings
+from app.services.fetchers import LocalFetcher
+from app.services.ingestion import refresh_symbol
+
+CLOSES = UPSTREAM_CLOSES['AAA']
+
+
+def stored_rows(directory, symbol):
+    frame = pd.read_csv(csv_path(str(directory), symbol))
+    days, closes = load_symbol(str(directory), symbol)
+    assert day_strings(days).tolist() == frame['Date'].tolist()  # .col agrees with the CSV
+    return frame['Date'].tolist(), frame['Close'].tolist()
+
+
+def test_incremental_add_appends_only_new_rows(data_dir, upstream_client):
+    write_csv(data_dir, 'AAA', zip(DAYS[:6], CLOSES[:6]))
+    response = upstream_client.post('/api/etfs/add', json={'symbol': 'AAA', 'mode': 'incremental'})
+    assert response.status_code == 200
+    assert response.get_json()['rows'] == 4
+    assert stored_rows(data_dir, 'AAA') == (DAYS, CLOSES)
+
+
+def test_incremental_refresh_redownloads_when_overlap_differs(data_dir, upstream):
+    write_csv(data_dir, 'AAA', zip(DAYS[:6], CLOSES[:5] + [42.0]))
+    result = refresh_symbol(str(data_dir), 'AAA', LocalFetcher(str(upstream)).fetch)
+    assert result['mode'] == 'full'
+    assert stored_rows(data_dir, 'AAA') == (DAYS, CLOSES)
+
+
+def test_concurrent_refreshes_do_not_duplicate_rows(data_dir, upstream):
+    write_csv(data_dir, 'AAA', zip(DAYS[:6], CLOSES[:6]))
+    fetch = LocalFetcher(str(upstream), delay=0.05).fetch
+    threads = [threading.Thread(target=refresh_symbol, args=(str(data_dir), 'AAA', fetch)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert stored_rows(data_dir, 'AAA') == (DAYS, CLOSES)
+
+
+@pytest.mark.parametrize('url, body', [
+    ('/api/etfs/add', {'symbol': 'AAA', 'mode': 'bogus'}),
+    ('/api/etfs/add_bulk', {'symbols': ['AAA'], 'mode': 'bogus'}),
+    ('/api/etfs/add_bulk', {'symbols': ['AAA'], 'mode': 'bogus', 'async': True}),
+])
+def test_unknown_mode_is_rejected(data_dir, upstream_client, url, body):
+    response = upstream_client.post(url, json=body)
+    assert response.status_code == 400
+    assert not (data_dir / 'AAA.csv').exists()
@@ -0,0 +1,31 @@
+import time
+
+from app.services.fetchers import LocalFetcher
+
+
+def wait_for_job(client, status_url, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(status_url).get_json()
+        if job['status'] in ('done', 'failed'):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"Job did not finish: {job}")
+
+
+def test_async_bulk_add_runs_as_a_job(tmp_path, data_dir, upstream, make_app):
+    client = make_app(ETF_FETCHER=LocalFetcher(str(upstream), delay=0.05)).test_client()
+
+    response = client.post('/api/etfs/add_bulk', json={'symbols': ['AAA', 'MISSING'], 'async': True})
+    assert response.status_code == 202
+    job = wait_for_job(client, response.get_json()['status_url'])
+
+    assert job['status'] == 'done'
+    assert job['progress'] == {'done': 2, 'total': 2}
+    assert [(r['symbol'], r['status']) for r in job['result']] == [('AAA', 'ok'), ('MISSING', 'not_found')]
+    assert (data_dir / 'AAA.csv').exists()
+    assert (tmp_path / 'snapshots').is_dir()
+
+
+def test_unknown_job_is_404(client):
+    assert client.get('/api/jobs/does-not-exist').status_code == 404
@@ -0,0 +1,86 @@
+import json
+import logging
+import logging.handlers
+import queue
+
+import pytest
+
+from app.services.logging_config import StructuredFormatter, SamplingFilter, RecordQueueHandler
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+
+
+@pytest.fixture
+def pipeline():
+    # The same queue -> listener -> formatter path setup_logging installs, on a private logger
+    def run(json_output, log):
+        records = queue.SimpleQueue()
+        output = ListHandler()
+        output.setFormatter(StructuredFormatter(json_output=json_output))
+        listener = logging.handlers.QueueListener(records, output)
+        logger = logging.getLogger(f"tests.logging.{json_output}")
+        logger.propagate = False
+        logger.setLevel(logging.DEBUG)
+        handler = RecordQueueHandler(records)
+        logger.addHandler(handler)
+        listener.start()
+        try:
+            log(logger)
+        finally:
+            listener.stop()
+            logger.removeHandler(handler)
+        return output.lines
+    return run
+
+
+def log_exception(logger):
+    logger.info("Loaded %s rows", 12, extra={'symbol': 'QQQ'})
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("Failed to load %s", 'QQQ')
+
+
+def test_json_lines_keep_fields_and_exception(pipeline):
+    info, error = [json.loads(line) for line in pipeline(True, log_exception)]
+    assert set(info) == {'time', 'level', 'logger', 'message', 'symbol'}
+    assert info['message'] == 'Loaded 12 rows'
+    assert info['level'] == 'INFO' and info['logger'] == 'tests.logging.True' and info['symbol'] == 'QQQ'
+    assert error['message'] == 'Failed to load QQQ'
+    assert error['exception'].startswith('Traceback')
+    assert error['exception'].endswith('ValueError: boom')
+
+
+def test_text_lines_append_fields_and_traceback(pipeline):
+    info, error = pipeline(False, log_exception)
+    assert info.endswith(' - INFO - Loaded 12 rows symbol=QQQ')
+    first, *traceback = error.splitlines()
+    assert first.endswith(' - ERROR - Failed to load QQQ')
+    assert traceback[0].startswith('Traceback') and traceback[-1] == 'ValueError: boom'
+
+
+def test_sampling_filter_passes_one_in_every():
+    sampling = SamplingFilter(3)
+    record = logging.LogRecord('x', logging.DEBUG, '', 0, 'message', None, None)
+    assert [sampling.filter(record) for _ in range(7)] == [True, False, False, True, False, False, True]
+    assert SamplingFilter(0).every == 1
+
+
+def test_setup_applies_levels_and_one_sampling_filter(make_app):
+    symbol_logger = logging.getLogger('app.services.data_processing.symbols')
+    make_app(LOG_LEVELS={'tests.logging.levels': 'WARNING'}, LOG_SYMBOL_SAMPLE_EVERY=7)
+    make_app(LOG_LEVEL='INFO', LOG_SYMBOL_SAMPLE_EVERY=5)
+    try:
+        assert logging.getLogger().level == logging.INFO
+        assert logging.getLogger('tests.logging.levels').level == logging.WARNING
+        filters = [f for f in symbol_logger.filters if isinstance(f, SamplingFilter)]
+        assert len(filters) == 1 and filters[0].every == 5
+    finally:
+        make_app()  # Back to the defaults for the other tests
@@ -0,0 +1,73 @@
+import pytest
+
+from app.services.metrics import metrics, Metrics
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    # The registry is process-wide
+    metrics.clear()
+
+
+def scrape(client):
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    samples = {}
+    for line in response.get_data(as_text=True).splitlines():
+        if not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            samples[name] = float(value)
+    return samples
+
+
+def test_stage_timings_are_summaries(synthetic_client):
+    assert synthetic_client.get('/api/etfs?symbols=S0').status_code == 200
+    samples = scrape(synthetic_client)
+    for quantile in ('0.5', '0.95', '0.99'):
+        assert samples[f'etf_stage_seconds{{stage="assemble_dt",quantile="{quantile}"}}'] >= 0
+    assert samples['etf_stage_seconds_count{stage="assemble_dt"}'] == 1
+    assert samples['etf_stage_seconds_sum{stage="assemble_dt"}'] == samples['etf_stage_seconds{stage="assemble_dt",quantile="0.5"}']
+    assert samples['etf_stage_seconds_count{stage="serialize"}'] == 1
+
+
+def test_requests_are_counted_by_method_route_and_status(synthetic_client):
+    synthetic_client.get('/api/etfs')
+    synthetic_client.get('/api/etfs')
+    synthetic_client.get('/api/etfs?symbols=../x')
+    synthetic_client.get('/api/jobs/unknown')
+    samples = scrape(synthetic_client)
+    assert samples['etf_requests_total{method="GET",route="/api/etfs",status="200"}'] == 2
+    assert samples['etf_requests_total{method="GET",route="/api/etfs",status="400"}'] == 1
+    assert samples['etf_requests_total{method="GET",route="/api/jobs/<job_id>",status="404"}'] == 1
+    assert samples['etf_request_seconds_count{route="/api/etfs"}'] == 3
+
+
+def test_response_bytes_match_the_bodies(synthetic_client):
+    body = synthetic_client.get('/api/etfs/chart_data').get_data()
+    samples = scrape(synthetic_client)
+    assert samples['etf_response_bytes_count{route="/api/etfs/chart_data"}'] == 1
+    assert samples['etf_response_bytes_sum{route="/api/etfs/chart_data"}'] == len(body)
+
+
+def test_ndjson_bytes_are_counted_by_the_stream(synthetic_client):
+    response = synthetic_client.get('/api/etfs?format=ndjson')
+    assert response.content_length is None
+    body = response.get_data()
+    samples = scrape(synthetic_client)
+    assert samples['etf_response_bytes_count{route="/api/etfs"}'] == 1
+    assert samples['etf_response_bytes_sum{route="/api/etfs"}'] == len(body)
+
+
+def test_render_quantiles_and_label_escaping():
+    registry = Metrics(window=100)
+    for value in range(1, 101):
+        registry.observe('etf_stage_seconds', float(value), stage='a"b')
+    registry.increment('etf_requests_total', 3, route='/x\\y', method='GET', status=200)
+    lines = registry.render().splitlines()
+    assert '# TYPE etf_stage_seconds summary' in lines
+    assert 'etf_stage_seconds{stage="a\\"b",quantile="0.5"} 51.0' in lines
+    assert 'etf_stage_seconds{stage="a\\"b",quantile="0.99"} 100.0' in lines
+    assert 'etf_stage_seconds_sum{stage="a\\"b"} 5050.0' in lines
+    assert 'etf_stage_seconds_count{stage="a\\"b"} 100' in lines
+    assert 'etf_requests_total{method="GET",route="/x\\\\y",status="200"} 3' in lines
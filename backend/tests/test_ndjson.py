@@ -0,0 +1,31 @@
+import json
+
+import pytest
+
+
+def read_lines(response):
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert all(len(line) == 1 for line in lines)  # One date per line
+    return [next(iter(line.items())) for line in lines]
+
+
+@pytest.mark.parametrize('query', ['', '&symbols=S1,EQA', '&start=2002-02&end=2002-03-10'])
+def test_lines_merge_to_the_json_response(synthetic_client, query):
+    full = synthetic_client.get(f"/api/etfs?{query}").get_json()
+    lines = read_lines(synthetic_client.get(f"/api/etfs?format=ndjson{query}"))
+    assert [date for date, _ in lines] == sorted(full)
+    assert dict(lines) == full
+
+
+def test_descending_order_starts_with_the_newest_date(synthetic_client):
+    full = synthetic_client.get('/api/etfs').get_json()
+    lines = read_lines(synthetic_client.get('/api/etfs?format=ndjson&order=desc'))
+    assert [date for date, _ in lines] == sorted(full, reverse=True)
+    assert dict(lines) == full
+
+
+@pytest.mark.parametrize('query', ['limit=5', 'after=2002-01-01', 'limit=5&after=2002-01-01', 'order=up'])
+def test_unsupported_parameters_are_400(synthetic_client, query):
+    assert synthetic_client.get(f"/api/etfs?format=ndjson&{query}").status_code == 400
@@ -0,0 +1,55 @@
+import pytest
+
+
+def follow_cursors(client, query):
+    pages = []
+    cursor = None
+    while True:
+        url = f"/api/etfs?{query}" + (f"&after={cursor}" if cursor else '')
+        response = client.get(url)
+        assert response.status_code == 200
+        page = response.get_json()
+        pages.append(page)
+        cursor = page['next_cursor']
+        if cursor is None:
+            return pages
+        assert cursor == page['dates'][-1]
+
+
+@pytest.mark.parametrize('query', ['', 'symbols=S1,EQA', 'start=2000-02&end=2000-03-10'])
+@pytest.mark.parametrize('limit', [7, 250, 10000])
+def test_pages_reassemble_the_full_response(synthetic_client, query, limit):
+    full = synthetic_client.get(f"/api/etfs?{query}").get_json()
+    pages = follow_cursors(synthetic_client, f"{query}&limit={limit}")
+    dates = [date for page in pages for date in page['dates']]
+    assert dates == sorted(full)
+    assert all(len(page['dates']) == limit for page in pages[:-1])
+    assert 1 <= len(pages[-1]['dates']) <= limit
+    merged = {}
+    for page in pages:
+        assert sorted(page['data']) == page['dates']
+        merged.update(page['data'])
+    assert merged == full
+
+
+def test_descending_pages_walk_backwards(synthetic_client):
+    full = synthetic_client.get('/api/etfs').get_json()
+    pages = follow_cursors(synthetic_client, 'limit=250&order=desc')
+    dates = [date for page in pages for date in page['dates']]
+    assert dates == sorted(full, reverse=True)
+
+
+def test_exact_multiple_has_no_empty_last_page(synthetic_client):
+    total = len(synthetic_client.get('/api/etfs').get_json())
+    pages = follow_cursors(synthetic_client, f"limit={total}")
+    assert len(pages) == 1
+
+
+def test_cursor_past_the_end_is_an_empty_page(synthetic_client):
+    page = synthetic_client.get('/api/etfs?after=2099-01-01').get_json()
+    assert page == {'data': {}, 'dates': [], 'next_cursor': None}
+
+
+@pytest.mark.parametrize('query', ['limit=0', 'limit=10001', 'limit=ten', 'after=someday', 'limit=5&order=up'])
+def test_invalid_paging_is_400(synthetic_client, query):
+    assert synthetic_client.get(f"/api/etfs?{query}").status_code == 400
@@ -0,0 +1,51 @@
+import threading
+
+import pytest
+
+from conftest import write_csv
+from app import routes
+
+TOKEN = {'X-Profile-Token': 'secret'}
+
+
+@pytest.fixture
+def profiled_client(data_dir, make_app):
+    write_csv(data_dir, 'AAA', [(f"2020-01-{day:02d}", 10.0 + day % 3) for day in range(2, 12)])
+    return make_app(PROFILING_SECRET='secret').test_client()
+
+
+def test_profile_is_captured_and_served(profiled_client):
+    response = profiled_client.get('/api/etfs', headers=TOKEN)
+    assert response.status_code == 200
+    url = response.headers['X-Profile-Url']
+    assert profiled_client.get(url).status_code == 404  # Needs the token too
+    report = profiled_client.get(url, headers=TOKEN)
+    assert report.status_code == 200 and b'cumulative' in report.get_data()
+    assert not routes._profiler_lock.locked()
+
+
+def test_profiling_needs_the_secret(profiled_client):
+    response = profiled_client.get('/api/etfs', headers={'X-Profile-Token': 'wrong'})
+    assert 'X-Profile-Id' not in response.headers
+
+
+def test_concurrent_profiled_request_is_served_unprofiled(profiled_client):
+    # While one capture runs, another profiled request still succeeds, just without a profile
+    with routes._profiler_lock:
+        response = profiled_client.get('/api/etfs', headers=TOKEN)
+    assert response.status_code == 200
+    assert 'X-Profile-Id' not in response.headers
+    assert response.headers['X-Profile-Skipped'] == 'busy'
+
+
+def test_parallel_profiled_requests_all_succeed(profiled_client, make_app):
+    statuses = []
+    def fetch():
+        statuses.append(make_app(PROFILING_SECRET='secret').test_client().get('/api/etfs?symbols=AAA', headers=TOKEN).status_code)
+    threads = [threading.Thread(target=fetch) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert statuses == [200] * 8
+    assert not routes._profiler_lock.locked()
@@ -0,0 +1,71 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import fixture_path
+from app.services.data_processing import month_groups, resample_monthly, CHART_FIELDS
+
+CLOSE = CHART_FIELDS.index('close')
+
+
+@pytest.fixture
+def series():
+    days = pd.bdate_range('2023-11-15', periods=120)
+    values = np.cumsum(np.random.default_rng(0).normal(size=len(days))) + 100
+    values[[0, 7, 8, 40, 41, 42]] = np.nan  # Including a month's first row
+    return days, values
+
+
+def expected(days, values, how):
+    # Row order within a month, so first/last are the literal rows, NaN or not
+    groups = pd.Series(values, index=days).groupby(days.to_period('M'))
+    if how == 'last':
+        return groups.apply(lambda s: s.iloc[-1]).to_numpy()
+    if how == 'first':
+        return groups.apply(lambda s: s.iloc[0]).to_numpy()
+    if how == 'mean':
+        return groups.mean().to_numpy()
+    return np.column_stack([groups.apply(lambda s: s.iloc[0]), groups.max(), groups.min(),
+                            groups.apply(lambda s: s.iloc[-1])])
+
+
+@pytest.mark.parametrize('how', ['last', 'first', 'mean', 'ohlc'])
+def test_matches_pandas_groupby(series, how):
+    days, values = series
+    months, starts = month_groups(days.values)
+    assert months.tolist() == days.to_period('M').unique().astype(str).tolist()
+    np.testing.assert_allclose(resample_monthly(values, starts, how), expected(days, values, how), equal_nan=True)
+
+
+def test_unknown_method_raises(series):
+    days, values = series
+    with pytest.raises(ValueError):
+        resample_monthly(values, month_groups(days.values)[1], 'median')
+
+
+def test_empty_series():
+    starts = np.array([], dtype=np.intp)
+    assert resample_monthly([], starts, 'mean').shape == (0,)
+    assert resample_monthly([], starts, 'ohlc').shape == (0, 4)
+
+
+@pytest.mark.parametrize('how', ['first', 'mean', 'ohlc'])
+def test_chart_route_close_matches_pandas(copy_fixture, client, how):
+    copy_fixture('short')
+    data = client.get(f"/api/etfs/chart_data?symbols=LONG&resample={how}").get_json()['data']
+    history = pd.read_csv(os.path.join(fixture_path('short'), 'LONG.csv'), parse_dates=['Date'])
+    closes = expected(pd.DatetimeIndex(history['Date']), history['Close'].to_numpy(), how)
+    served = [data[month]['LONG'][CLOSE] for month in sorted(data)]
+    np.testing.assert_allclose(served, closes, rtol=0, atol=0.005 + 1e-9)  # Served values are rounded to cents
+
+
+def test_last_is_the_default(copy_fixture, client):
+    copy_fixture('short')
+    assert client.get('/api/etfs/chart_data?symbols=LONG&resample=last').get_data() == \
+        client.get('/api/etfs/chart_data?symbols=LONG').get_data()
+
+
+def test_unknown_resample_is_400(client):
+    assert client.get('/api/etfs/chart_data?resample=median').status_code == 400
@@ -0,0 +1,30 @@
+# A newly listed symbol can have only a couple of rows; it must not break the
+# responses for every other symbol.
+import numpy as np
+from scipy.signal import savgol_filter
+
+from conftest import golden
+from app.services.smoothing import moving_linear_smooth
+
+
+def test_etfs_serves_two_row_symbol_like_baseline(copy_fixture, client):
+    copy_fixture('short')
+    response = client.get('/api/etfs')
+    assert response.status_code == 200
+    assert response.get_data() == golden('short_etfs')
+    assert client.get('/api/etfs?symbols=SHORT').status_code == 200
+
+
+def test_chart_data_leaves_short_symbol_unsmoothed(copy_fixture, client):
+    copy_fixture('short')
+    response = client.get('/api/etfs/chart_data')
+    assert response.status_code == 200
+    rows = [etfs['SHORT'] for etfs in response.get_json()['data'].values() if 'SHORT' in etfs]
+    assert rows and all(row[4:] == [None, None, None] for row in rows)
+    assert client.get('/api/etfs/chart_data?format=columnar').status_code == 200
+
+
+def test_moving_linear_smooth_short_series():
+    assert np.isnan(moving_linear_smooth([1.0, 2.0], (201, 401))).all()
+    values = np.array([3.0, 1.0, 4.0])
+    np.testing.assert_allclose(moving_linear_smooth(values, (201,))[0], savgol_filter(values, 3, 1))
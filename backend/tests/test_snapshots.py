@@ -0,0 +1,51 @@
+import glob
+import gzip
+import os
+import threading
+
+import brotli
+
+from conftest import golden
+from app import routes
+from app.services import snapshots
+
+
+def test_compressed_variants_decode_to_the_plain_body(synthetic_client):
+    plain = synthetic_client.get('/api/etfs').get_data()
+    response = synthetic_client.get('/api/etfs', headers={'Accept-Encoding': 'br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert brotli.decompress(response.get_data()) == plain
+    response = synthetic_client.get('/api/etfs', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.get_data()) == plain == golden('synthetic_etfs')
+
+
+def test_snapshot_build_only_waits_for_its_own_name(synthetic_client):
+    # A chart_data build in progress must not hold up /api/etfs
+    responses = []
+    with snapshots._build_locks['chart_data']:
+        request = threading.Thread(target=lambda: responses.append(synthetic_client.get('/api/etfs')))
+        request.start()
+        request.join(timeout=30)
+        assert not request.is_alive()
+    assert responses[0].status_code == 200
+
+
+def test_snapshot_removed_before_it_is_sent_is_served_from_current_data(synthetic_client, monkeypatch):
+    # A background build for newer data can remove the files ensure_snapshot just returned
+    ensure_snapshot = snapshots.ensure_snapshot
+    calls = []
+
+    def ensure_then_replace(*args, **kwargs):
+        path = ensure_snapshot(*args, **kwargs)
+        if not calls:
+            for stale in glob.glob(path + '*'):
+                os.remove(stale)
+        calls.append(path)
+        return path
+
+    monkeypatch.setattr(routes, 'ensure_snapshot', ensure_then_replace)
+    response = synthetic_client.get('/api/etfs', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert len(calls) == 2
+    assert gzip.decompress(response.get_data()) == golden('synthetic_etfs')
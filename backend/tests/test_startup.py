@@ -0,0 +1,35 @@
+# Heavy modules must load on first use, not when a worker creates the app
+import json
+import os
+import subprocess
+import sys
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAZY_MODULES = ('scipy', 'yfinance', 'pyarrow')
+
+STARTUP_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+from app import create_app
+create_app({'BUILD_SNAPSHOTS_ON_STARTUP': False, 'LOG_FILE': sys.argv[1]})
+from app.services.arrow_export import load_pyarrow
+print(json.dumps({'seconds': time.perf_counter() - started,
+                  'modules': [m for m in sys.argv[2:] if m in sys.modules],
+                  'pyarrow_loaded_by_app': load_pyarrow.cache_info().currsize > 0}))
+"""
+# pandas itself imports pyarrow when it is installed, which the app cannot avoid
+PANDAS_SCRIPT = "import json, sys, pandas; print(json.dumps([m for m in sys.argv[1:] if m in sys.modules]))"
+
+
+def run(script, *args):
+    output = subprocess.run([sys.executable, '-c', script, *args], cwd=BACKEND,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def test_create_app_does_not_import_heavy_modules(tmp_path):
+    startup = run(STARTUP_SCRIPT, str(tmp_path / 'app.log'), *LAZY_MODULES)
+    loaded_by_pandas = run(PANDAS_SCRIPT, *LAZY_MODULES)
+    assert [m for m in startup['modules'] if m not in loaded_by_pandas] == []
+    assert not startup['pyarrow_loaded_by_app']
+    print(f"create_app cold start: {startup['seconds']:.3f}s")